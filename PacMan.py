@@ -1,487 +1,385 @@
+import argparse
+import time
 import arcade
 from dataclasses import dataclass
-from typing import List, Tuple, Deque, Dict, Optional
-import random
-from collections import deque
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+from PIL import Image
+
+from pacman_core import (
+    EMPTY,
+    PELLET,
+    PELLET_SIZE,
+    POWER_SIZE,
+    TICK_RATE,
+    TILE_SIZE,
+    GameState,
+    Level,
+)
+from pacman_autopilot import Autopilot
+from pacman_maps import load_level
+from pacman_tour import TOUR_BUDGET
 
 # Alias de tipo para colores (arcade usa tuplas RGB o RGBA)
 ColorType = Tuple[int, int, int] | Tuple[int, int, int, int]
 
 # ===================== CONFIGURACIÓN GENERAL =====================
+# Las reglas, el mapa y las velocidades viven en pacman_core; aquí sólo se
+# configura la ventana que los dibuja. El tamaño de la ventana sale del Level,
+# hasta MAX_SCREEN_WIDTH x MAX_SCREEN_HEIGHT; en mapas más grandes la cámara
+# sigue a Pac-Man.
 SCREEN_TITLE = "PacGPT5"
-TILE_SIZE = 32
 SCALE = 1
-MOVEMENT_SPEED = 4  # píxeles por frame (debe dividir TILE_SIZE)
-GHOST_SPEED = 2
-POWER_TIME = 7.0
 SCREEN_MARGIN = 32
-
-# Mapa: # pared, . punto, o power pellet, P pacman start, G ghost start, ' ' vacío
-# Debe ser rectangular
-RAW_MAP = [
-    "######################",
-    "#........##..........#",
-    "#.##.###.##.###.##..#",
-    "#o##.###.##.###.##o.#",
-    "#....................#",
-    "#.##.#.######.#.##.#.#",
-    "#....#....##....#....#",
-    "####.### #### ###.####",
-    "#P.......G  G.......P#",
-    "####.### #### ###.####",
-    "#....#....##....#....#",
-    "#.##.#.######.#.##.#.#",
-    "#....................#",
-    "#o##.###.##.###.##o.#",
-    "#.##.###.##.###.##..#",
-    "#........##..........#",
-    "######################",
+MAX_SCREEN_WIDTH = 1280
+MAX_SCREEN_HEIGHT = 720
+# Los pellets se dibujan por regiones de ITEM_REGION x ITEM_REGION celdas,
+# armadas cuando entran en la vista de la cámara
+ITEM_REGION = 32
+
+# ===================== TIEMPO =====================
+# La simulación avanza en ticks fijos de 1/TICK_RATE; cada frame ejecuta los
+# ticks que tocan según el tiempo real y la escala de tiempo, así que la
+# velocidad cambia cuántos ticks hay por frame, nunca lo que pasa en cada uno.
+FRAME_TIME = 1 / TICK_RATE
+TIME_SCALES = (1, 10, 100)  # velocidades de la tecla T (turbo)
+SIM_BUDGET = 0.75  # fracción del frame que puede usar la simulación
+MAX_FRAME_SKIP = 8  # con la simulación atrasada se dibuja 1 de cada N frames
+
+GHOST_COLORS = [
+    arcade.color.RED,
+    arcade.color.GREEN,
+    arcade.color.PURPLE,
+    arcade.color.PINK,
 ]
 
-ROWS = len(RAW_MAP)
-COLS = len(RAW_MAP[0])
-SCREEN_WIDTH = COLS * TILE_SIZE
-SCREEN_HEIGHT = ROWS * TILE_SIZE
-
-# ===================== DATACLASES / UTILIDADES =====================
-
-
-def grid_to_pixel(col: int, row: int) -> Tuple[int, int]:
-    x = col * TILE_SIZE + TILE_SIZE // 2
-    y = (ROWS - row - 1) * TILE_SIZE + TILE_SIZE // 2
-    return x, y
-
-
-def pixel_to_grid(x: float, y: float) -> Tuple[int, int]:
-    col = int(x // TILE_SIZE)
-    row_from_bottom = int(y // TILE_SIZE)
-    row = ROWS - row_from_bottom - 1
-    return col, row
-
-
-def is_center_of_cell(sprite: arcade.Sprite) -> bool:
-    # Consideramos que está centrado si está muy cerca del centro
-    col, row = pixel_to_grid(sprite.center_x, sprite.center_y)
-    cx, cy = grid_to_pixel(col, row)
-    return abs(sprite.center_x - cx) < 2 and abs(sprite.center_y - cy) < 2
-
 
 @dataclass
 class GhostState:
     normal_color: ColorType
     frightened_color: ColorType = arcade.color.BLUE
+    dead_color: ColorType = arcade.color.GRAY
 
-
-# ===================== SPRITES PERSONALIZADOS =====================
-class Pacman(arcade.Sprite):
-    def __init__(self, col: int, row: int):
-        super().__init__()
-        # Crear textura base blanca y aplicar color (tinte) para compatibilidad
-        self.texture = arcade.make_soft_square_texture(
-            TILE_SIZE, arcade.color.WHITE, 255
-        )
-        self.color = arcade.color.YELLOW
-        x, y = grid_to_pixel(col, row)
-        self.center_x = x
-        self.center_y = y
-        self.current_dir = (0, 0)
-        self.desired_dir = (0, 0)
-        self.lives = 3
-        self.score = 0
-        self.power_timer = 0
-
-    def set_direction(self, dx: int, dy: int):
-        self.desired_dir = (dx, dy)
-
-    def update_move(self, walls_grid):
-        # Convertir a movimiento centrado en celdas
-        if is_center_of_cell(self):
-            # Intentar cambiar a dirección deseada si no hay pared
-            if self.can_move(self.desired_dir, walls_grid):
-                self.current_dir = self.desired_dir
-            # Si la dirección actual está bloqueada, parar
-            if not self.can_move(self.current_dir, walls_grid):
-                self.current_dir = (0, 0)
-
-            # Ajustar exactamente al centro para evitar acumulación de error
-            col, row = pixel_to_grid(self.center_x, self.center_y)
-            cx, cy = grid_to_pixel(col, row)
-            self.center_x, self.center_y = cx, cy
-
-        self.center_x += self.current_dir[0] * MOVEMENT_SPEED
-        self.center_y += self.current_dir[1] * MOVEMENT_SPEED
-
-    def can_move(self, direction, walls_grid) -> bool:
-        dx, dy = direction
-        if dx == 0 and dy == 0:
-            return True
-        col, row = pixel_to_grid(self.center_x, self.center_y)
-        # mirar celda destino
-        target_col = col + dx
-        target_row = row - dy  # porque y positiva es arriba (fila menor)
-        if target_col < 0 or target_col >= COLS or target_row < 0 or target_row >= ROWS:
-            return False
-        return walls_grid[target_row][target_col] == 0
-
-
-class Ghost(arcade.Sprite):
-    def __init__(self, col: int, row: int, state: GhostState):
-        super().__init__()
-        # Textura base blanca y luego se ajusta self.color
-        self.texture = arcade.make_soft_square_texture(
-            TILE_SIZE, arcade.color.WHITE, 255
-        )
-        self.color = state.normal_color
-        x, y = grid_to_pixel(col, row)
-        self.center_x = x
-        self.center_y = y
-        self.spawn_col = col
-        self.spawn_row = row
-        self.state = state
-        self.current_dir = random.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
-        self.frightened = False
-        self.dead = False
-        self.change_counter = 0.0
-
-    def update_move(self, walls_grid, pacman: Pacman, delta_time: float):
-        speed = GHOST_SPEED
-        self.change_counter += delta_time
-
-        if self.dead:
-            # Ir de vuelta a spawn
-            target = (self.spawn_col, self.spawn_row)
-            if self._at_target(target):
-                self.dead = False
-                self.frightened = False
-                self.color = self.state.normal_color
-            else:
-                self._move_towards(target, walls_grid, speed)
-            return
-
-        if self.frightened:
-            self.color = self.state.frightened_color
-            if self.change_counter > 0.4:
-                self.current_dir = self._random_dir(walls_grid)
-                self.change_counter = 0
-        else:
-            self.color = self.state.normal_color
-            # perseguir o deambular
-            if self.change_counter > 0.3:
-                self.current_dir = self._chase_dir(pacman, walls_grid)
-                self.change_counter = 0
-
-        if is_center_of_cell(self):
-            # asegurar no entremos a pared
-            if not self._can_dir(self.current_dir, walls_grid):
-                self.current_dir = self._random_dir(walls_grid)
-
-            # snap
-            col, row = pixel_to_grid(self.center_x, self.center_y)
-            self.center_x, self.center_y = grid_to_pixel(col, row)
-
-        self.center_x += self.current_dir[0] * speed
-        self.center_y += self.current_dir[1] * speed
-
-    def _at_target(self, target_cell):
-        col, row = pixel_to_grid(self.center_x, self.center_y)
-        return (col, row) == target_cell
-
-    def _move_towards(self, target_cell, walls_grid, speed):
-        if is_center_of_cell(self):
-            col, row = pixel_to_grid(self.center_x, self.center_y)
-            tcol, trow = target_cell
-            options = []
-            if tcol > col:
-                options.append((1, 0))
-            if tcol < col:
-                options.append((-1, 0))
-            if trow > row:
-                options.append((0, -1))  # arriba en pantalla -> fila menor
-            if trow < row:
-                options.append((0, 1))
-            random.shuffle(options)
-            for d in options:
-                if self._can_dir(d, walls_grid):
-                    self.current_dir = d
-                    break
-            else:
-                self.current_dir = self._random_dir(walls_grid)
-        self.center_x += self.current_dir[0] * speed
-        self.center_y += self.current_dir[1] * speed
-
-    def _chase_dir(self, pacman: Pacman, walls_grid):
-        # line-of-sight simple: priorizar dirección que reduce distancia Manhattan
-        col, row = pixel_to_grid(self.center_x, self.center_y)
-        pcol, prow = pixel_to_grid(pacman.center_x, pacman.center_y)
-        dirs = []
-        if pcol > col:
-            dirs.append((1, 0))
-        if pcol < col:
-            dirs.append((-1, 0))
-        if prow > row:
-            dirs.append((0, -1))
-        if prow < row:
-            dirs.append((0, 1))
-        random.shuffle(dirs)
-        for d in dirs:
-            if self._can_dir(d, walls_grid):
-                return d
-        return self._random_dir(walls_grid)
-
-    def _random_dir(self, walls_grid):
-        choices = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-        random.shuffle(choices)
-        for d in choices:
-            if self._can_dir(d, walls_grid):
-                return d
-        return (0, 0)
-
-    def _can_dir(self, d, walls_grid):
-        dx, dy = d
-        col, row = pixel_to_grid(self.center_x, self.center_y)
-        tcol = col + dx
-        trow = row - dy
-        if tcol < 0 or tcol >= COLS or trow < 0 or trow >= ROWS:
-            return False
-        return walls_grid[trow][tcol] == 0
-
-    def eaten(self):
-        self.dead = True
-        self.frightened = False
-        self.color = arcade.color.GRAY
+    @property
+    def colors(self) -> Tuple[ColorType, ColorType, ColorType]:
+        """Colores indexados por modo (NORMAL, FRIGHTENED, DEAD)."""
+        return (self.normal_color, self.frightened_color, self.dead_color)
 
 
 # ===================== JUEGO PRINCIPAL =====================
 class PacGPT5(arcade.Window):
-    def __init__(self):
-        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, update_rate=1 / 60)
+    """Ventana que dibuja un GameState y le pasa la entrada del teclado."""
+
+    def __init__(
+        self,
+        level: Level | None = None,
+        time_scale: float = 1,
+        n_ghosts: int | None = None,
+        plan_budget: float = TOUR_BUDGET,
+    ):
+        self.level = level if level is not None else Level()
+        super().__init__(
+            min(self.level.width, MAX_SCREEN_WIDTH),
+            min(self.level.height, MAX_SCREEN_HEIGHT),
+            SCREEN_TITLE,
+            update_rate=FRAME_TIME,
+            draw_rate=FRAME_TIME,
+        )
         arcade.set_background_color(arcade.color.BLACK)
+        # Una cámara para el mapa, que sigue a Pac-Man, y otra fija para la UI
+        self.camera = arcade.Camera2D()
+        self.gui_camera = arcade.Camera2D()
         self.wall_list = arcade.SpriteList()
-        self.pellet_list = arcade.SpriteList()
-        self.power_list = arcade.SpriteList()
-        self.ghosts: List[Ghost] = []
-        self.pacman: Pacman | None = None
-        self.walls_grid = []  # 1 pared, 0 libre
-        self.state = "PLAY"  # PLAY, WIN, LOSE
-        # Autopiloto
+        # Vista de GameState.items por regiones: SpriteList de cada región
+        # armada, las celdas que tiene y el sprite de cada pellet/power pellet
+        # por índice de celda, para ocultarlo cuando el núcleo lo come
+        self.item_lists: Dict[Tuple[int, int], arcade.SpriteList] = {}
+        self.region_items: Dict[Tuple[int, int], List[int]] = {}
+        self.item_sprites: Dict[int, arcade.Sprite] = {}
+        self.visible_regions: Set[Tuple[int, int]] = set()
+        self.ghost_list = arcade.SpriteList()
+        self.ghost_styles = []
+        self.n_ghosts = n_ghosts
+        self.game: GameState | None = None
+        # Paso fijo: ticks pendientes (fracción) y frames por cada dibujo
+        self.time_scale = time_scale
+        self.tick_accumulator = 0.0
+        self.frame_skip = 1
+        # Autopiloto: se arma (grafo de cruces y ruta, con plan_budget
+        # segundos para mejorarla) la primera vez que se activa; los
+        # reinicios reusan su orden y sus tramos
         self.autopilot = False
-        self.autopilot_path = []  # Secuencia de celdas (col,row)
+        self.plan_budget = plan_budget
+        self.pilot: Autopilot | None = None
 
     def setup(self):
+        self.game = GameState(self.level, n_ghosts=self.n_ghosts)
         self.wall_list = arcade.SpriteList()
-        self.pellet_list = arcade.SpriteList()
-        self.power_list = arcade.SpriteList()
-        self.ghosts = []
-        self.state = "PLAY"
-        self.walls_grid = [[0] * COLS for _ in range(ROWS)]
-        self.autopilot_path.clear()
-
-        pacman_positions = []
-        ghost_positions = []
-
-        for r, row in enumerate(RAW_MAP):
-            for c, ch in enumerate(row):
-                x, y = grid_to_pixel(c, r)
-                if ch == "#":
-                    wall = arcade.SpriteSolidColor(
-                        TILE_SIZE, TILE_SIZE, arcade.color.DARK_BLUE
-                    )
-                    wall.center_x = x
-                    wall.center_y = y
-                    self.wall_list.append(wall)
-                    self.walls_grid[r][c] = 1
-                elif ch == ".":
-                    pellet = arcade.SpriteSolidColor(6, 6, arcade.color.WHITE)
-                    pellet.center_x = x
-                    pellet.center_y = y
-                    self.pellet_list.append(pellet)
-                elif ch == "o":
-                    power = arcade.SpriteSolidColor(14, 14, arcade.color.ORANGE_PEEL)
-                    power.center_x = x
-                    power.center_y = y
-                    self.power_list.append(power)
-                elif ch == "P":
-                    pacman_positions.append((c, r))
-                elif ch == "G":
-                    ghost_positions.append((c, r))
-
-        # Crear Pac-Man (usar primera P; si hay dos, la segunda se convierte en pellet start)
-        if pacman_positions:
-            col, row = pacman_positions[0]
-            self.pacman = Pacman(col, row)
-            # Las otras P se tratan como pellets
-            for extra in pacman_positions[1:]:
-                c, r = extra
-                px, py = grid_to_pixel(c, r)
-                pellet = arcade.SpriteSolidColor(6, 6, arcade.color.WHITE)
-                pellet.center_x = px
-                pellet.center_y = py
-                self.pellet_list.append(pellet)
-        else:
-            # fallback centro
-            self.pacman = Pacman(COLS // 2, ROWS // 2)
-
-        # Crear fantasmas
-        colors = [
-            arcade.color.RED,
-            arcade.color.GREEN,
-            arcade.color.PURPLE,
-            arcade.color.PINK,
+        self.item_lists = {}
+        self.region_items = {}
+        self.item_sprites = {}
+        self.visible_regions = set()
+        self.tick_accumulator = 0.0
+        if self.pilot is not None:
+            self.pilot.restart(self.game)
+        self._set_autopilot(self.autopilot)
+
+        self.wall_list.append(self._wall_sprite())
+        self._follow_pacman()
+
+        self.ghost_styles = [
+            GhostState(GHOST_COLORS[idx % len(GHOST_COLORS)])
+            for idx in range(len(self.game.ghosts))
         ]
-        for idx, pos in enumerate(ghost_positions):
-            col, row = pos
-            ghost = Ghost(col, row, GhostState(colors[idx % len(colors)]))
-            self.ghosts.append(ghost)
+        # Un sprite por fantasma en una sola SpriteList: con miles de
+        # fantasmas se dibujan todos en una llamada
+        self.ghost_list = arcade.SpriteList()
+        for style in self.ghost_styles:
+            sprite = arcade.SpriteSolidColor(TILE_SIZE, TILE_SIZE, color=style.normal_color)
+            self.ghost_list.append(sprite)
+
+    def _wall_sprite(self) -> arcade.Sprite:
+        # Todas las paredes en una textura de un píxel por celda, escalada a
+        # TILE_SIZE y dibujada sin filtrar: un solo sprite sin importar el
+        # tamaño del mapa, en lugar de uno por cada '#'.
+        level = self.level
+        mask = Image.frombytes("L", (level.cols, level.rows), bytes(level.walls))
+        image = Image.new("RGBA", mask.size, (0, 0, 0, 0))
+        image.paste(arcade.color.DARK_BLUE, mask=mask.point(lambda v: 255 if v else 0))
+        sprite = arcade.Sprite(arcade.Texture(image), scale=TILE_SIZE)
+        sprite.center_x = level.width / 2
+        sprite.center_y = level.height / 2
+        return sprite
+
+    def _follow_pacman(self):
+        # Centrar la cámara en Pac-Man sin mostrar nada fuera del mapa y
+        # armar los pellets de lo que queda a la vista
+        level = self.level
+        pacman = self.game.pacman
+        half_width, half_height = self.width / 2, self.height / 2
+        x = min(max(pacman.center_x, half_width), level.width - half_width)
+        y = min(max(pacman.center_y, half_height), level.height - half_height)
+        self.camera.position = (x, y)
+        self._stream_items(x - half_width, y - half_height, x + half_width, y + half_height)
+
+    def _stream_items(self, left: float, bottom: float, right: float, top: float):
+        """Arma las regiones de pellets que tocan el rectángulo (en píxeles
+        del mapa) y suelta las que quedaron lejos de él.
+
+        Arrancar o reiniciar sólo crea los sprites de lo que se ve, así que
+        no depende del tamaño del mapa.
+        """
+        level = self.level
+        first_col = max(int(left // TILE_SIZE), 0) // ITEM_REGION
+        last_col = min(int(right // TILE_SIZE), level.cols - 1) // ITEM_REGION
+        first_row = max(level.rows - 1 - int(top // TILE_SIZE), 0) // ITEM_REGION
+        last_row = min(level.rows - 1 - int(bottom // TILE_SIZE), level.rows - 1) // ITEM_REGION
+        visible = {
+            (region_col, region_row)
+            for region_col in range(first_col, last_col + 1)
+            for region_row in range(first_row, last_row + 1)
+        }
+        if visible == self.visible_regions:
+            return
+        # Un anillo extra de regiones vivas para no rearmarlas en los bordes
+        keep = {(c + dc, r + dr) for c, r in visible for dc in (-1, 0, 1) for dr in (-1, 0, 1)}
+        for key in list(self.item_lists):
+            if key not in keep:
+                del self.item_lists[key]
+                for index in self.region_items.pop(key):
+                    self.item_sprites.pop(index, None)
+        for key in visible - self.item_lists.keys():
+            self._build_region(*key)
+        self.visible_regions = visible
+
+    def _build_region(self, region_col: int, region_row: int):
+        # Sprites de los pellets y power pellets que quedan en la región
+        level = self.level
+        items = np.frombuffer(self.game.items, dtype=np.uint8).reshape(level.rows, level.cols)
+        col0, row0 = region_col * ITEM_REGION, region_row * ITEM_REGION
+        block = items[row0 : row0 + ITEM_REGION, col0 : col0 + ITEM_REGION]
+        sprite_list = arcade.SpriteList()
+        indices = []
+        for row, col in (np.argwhere(block != EMPTY) + (row0, col0)).tolist():
+            if block[row - row0, col - col0] == PELLET:
+                sprite = arcade.SpriteSolidColor(PELLET_SIZE, PELLET_SIZE, color=arcade.color.WHITE)
+            else:
+                sprite = arcade.SpriteSolidColor(
+                    POWER_SIZE, POWER_SIZE, color=arcade.color.ORANGE_PEEL
+                )
+            sprite.center_x, sprite.center_y = level.grid_to_pixel(col, row)
+            sprite_list.append(sprite)
+            index = level.cell_index(col, row)
+            self.item_sprites[index] = sprite
+            indices.append(index)
+        del items, block
+        self.item_lists[region_col, region_row] = sprite_list
+        self.region_items[region_col, region_row] = indices
 
     # ===================== CICLO =====================
     def on_draw(self):
         # En Arcade 3.x se debe usar clear() dentro de on_draw en vez de start_render()
         self.clear()
-        self.wall_list.draw()
-        self.pellet_list.draw()
-        self.power_list.draw()
-        # Dibujar Pac-Man y fantasmas manualmente (evita dependencia de sprite.draw)
-        if self.pacman:
-            rect_p = arcade.rect.XYWH(
-                self.pacman.center_x, self.pacman.center_y, TILE_SIZE, TILE_SIZE
-            )
-            arcade.draw_rect_filled(
-                rect_p, getattr(self.pacman, "color", arcade.color.YELLOW)
-            )
-        for g in self.ghosts:
-            rect_g = arcade.rect.XYWH(g.center_x, g.center_y, TILE_SIZE, TILE_SIZE)
-            arcade.draw_rect_filled(rect_g, getattr(g, "color", arcade.color.RED))
+        if not self.game:
+            return
+        self.camera.use()
+        self.wall_list.draw(pixelated=True)
+        for key in self.visible_regions:
+            self.item_lists[key].draw()
+        pacman = self.game.pacman
+        # Dibujar Pac-Man manualmente (evita dependencia de sprite.draw)
+        rect_p = arcade.rect.XYWH(pacman.center_x, pacman.center_y, TILE_SIZE, TILE_SIZE)
+        arcade.draw_rect_filled(rect_p, arcade.color.YELLOW)
+        self._sync_ghosts()
+        self.ghost_list.draw()
 
         # UI
-        if self.pacman:
-            arcade.draw_text(
-                f"Score: {self.pacman.score}",
-                10,
-                SCREEN_HEIGHT - 22,
-                arcade.color.YELLOW,
-                14,
-            )
+        self.gui_camera.use()
+        arcade.draw_text(
+            f"Score: {pacman.score}",
+            10,
+            self.height - 22,
+            arcade.color.YELLOW,
+            14,
+        )
+        arcade.draw_text(
+            f"Vidas: {pacman.lives}",
+            10,
+            self.height - 40,
+            arcade.color.YELLOW,
+            14,
+        )
+        if pacman.power_timer > 0:
             arcade.draw_text(
-                f"Vidas: {self.pacman.lives}",
+                f"Poder: {pacman.power_timer / TICK_RATE:0.1f}",
                 10,
-                SCREEN_HEIGHT - 40,
-                arcade.color.YELLOW,
+                self.height - 58,
+                arcade.color.ORANGE_PEEL,
                 14,
             )
-            if self.pacman.power_timer > 0:
-                arcade.draw_text(
-                    f"Poder: {self.pacman.power_timer:0.1f}",
-                    10,
-                    SCREEN_HEIGHT - 58,
-                    arcade.color.ORANGE_PEEL,
-                    14,
-                )
 
-        if self.state == "WIN":
+        if self.game.state == "WIN":
             arcade.draw_text(
                 "¡GANASTE!",
-                SCREEN_WIDTH / 2,
-                SCREEN_HEIGHT / 2,
+                self.width / 2,
+                self.height / 2,
                 arcade.color.GREEN,
                 40,
                 anchor_x="center",
             )
-        elif self.state == "LOSE":
+        elif self.game.state == "LOSE":
             arcade.draw_text(
                 "GAME OVER",
-                SCREEN_WIDTH / 2,
-                SCREEN_HEIGHT / 2,
+                self.width / 2,
+                self.height / 2,
                 arcade.color.RED,
                 40,
                 anchor_x="center",
             )
+        if self.time_scale != 1 or self.frame_skip > 1:
+            arcade.draw_text(
+                f"x{self.time_scale:g} (tecla T)"
+                + (f"  dibujo 1/{self.frame_skip}" if self.frame_skip > 1 else ""),
+                10,
+                10,
+                arcade.color.WHITE,
+                12,
+            )
         # Indicador de autopiloto
         arcade.draw_text(
             f"Autopiloto: {'ON' if self.autopilot else 'OFF'} (tecla A)",
-            SCREEN_WIDTH - 10,
+            self.width - 10,
             10,
             arcade.color.WHITE,
             12,
             anchor_x="right",
         )
 
-    def on_update(self, delta_time: float):
-        if self.state != "PLAY" or not self.pacman:
-            return
+    def _sync_ghosts(self):
+        # Copiar posición y color (según el modo) de los arreglos de Ghosts
+        ghosts = self.game.ghosts
+        for sprite, style, x, y, mode in zip(
+            self.ghost_list,
+            self.ghost_styles,
+            ghosts.x.tolist(),
+            ghosts.y.tolist(),
+            ghosts.mode.tolist(),
+        ):
+            sprite.position = (x, y)
+            sprite.color = style.colors[mode]
 
-        # Update timers
-        if self.pacman.power_timer > 0:
-            self.pacman.power_timer -= delta_time
-            if self.pacman.power_timer <= 0:
-                # fin del poder
-                for g in self.ghosts:
-                    if not g.dead:
-                        g.frightened = False
-
-        # Movimiento Pac-Man
-        self.pacman.update_move(self.walls_grid)
-
-        # Comer pellets
-        pellets_hit = arcade.check_for_collision_with_list(
-            self.pacman, self.pellet_list
-        )
-        for p in pellets_hit:
-            p.remove_from_sprite_lists()
-            self.pacman.score += 10
-
-        powers_hit = arcade.check_for_collision_with_list(self.pacman, self.power_list)
-        if powers_hit:
-            for pw in powers_hit:
-                pw.remove_from_sprite_lists()
-            self.pacman.power_timer = POWER_TIME
-            for g in self.ghosts:
-                if not g.dead:
-                    g.frightened = True
-
-        # Ver victoria
-        if len(self.pellet_list) == 0 and len(self.power_list) == 0:
-            self.state = "WIN"
-
-    def _reset_positions(self):
-        # Reiniciar pacman y fantasmas a spawn
-        if not self.pacman:
+    def on_update(self, delta_time: float):
+        if not self.game or self.game.state != "PLAY":
+            self.tick_accumulator = 0.0
             return
-        # Buscar spawn original (el primero P del mapa)
-        for r, row in enumerate(RAW_MAP):
-            for c, ch in enumerate(row):
-                if ch == "P":
-                    x, y = grid_to_pixel(c, r)
-                    self.pacman.center_x = x
-                    self.pacman.center_y = y
-                    self.pacman.current_dir = (0, 0)
-                    self.pacman.desired_dir = (0, 0)
-                    self.pacman.power_timer = 0
-                    break
-            else:
-                continue
-            break
-        for g in self.ghosts:
-            x, y = grid_to_pixel(g.spawn_col, g.spawn_row)
-            g.center_x = x
-            g.center_y = y
-            g.dead = False
-            g.frightened = False
-            g.current_dir = random.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
-            g.color = g.state.normal_color
+        self.tick_accumulator += delta_time * TICK_RATE * self.time_scale
+        pending = int(self.tick_accumulator)
+        self.tick_accumulator -= pending
+
+        # Ticks fijos del núcleo hasta ponerse al día o agotar el presupuesto
+        # del frame. ``advance`` salta de evento en evento, así que los ticks
+        # sin giros, pellets ni choques salen casi gratis. Lo que no alcanza
+        # se descarta: la partida va más lenta de lo pedido, pero es la misma.
+        start = time.perf_counter()
+        deadline = start + SIM_BUDGET * FRAME_TIME
+        while pending > 0 and self.game.state == "PLAY":
+            pending -= self.game.advance(max_ticks=pending)
+            # Ocultar los sprites de lo comido: actualiza sólo su posición en
+            # el buffer de la SpriteList, sin el costo de sacarlos de la lista.
+            for index in self.game.last_eaten:
+                sprite = self.item_sprites.pop(index, None)
+                if sprite is not None:
+                    sprite.visible = False
+            if time.perf_counter() > deadline:
+                break
+        self._follow_pacman()
+        self._adjust_frame_skip(time.perf_counter() - start)
+
+    def _adjust_frame_skip(self, elapsed: float):
+        # Si la simulación se come el frame, dibujar menos a menudo deja más
+        # vueltas del bucle para ella; cuando sobra tiempo se vuelve a dibujar
+        # todos los frames.
+        skip = self.frame_skip
+        if elapsed > SIM_BUDGET * FRAME_TIME:
+            skip = min(skip * 2, MAX_FRAME_SKIP)
+        elif elapsed < SIM_BUDGET * FRAME_TIME / 4:
+            skip = max(skip // 2, 1)
+        if skip != self.frame_skip:
+            self.frame_skip = skip
+            self.set_draw_rate(FRAME_TIME * skip)
 
     # ===================== INPUT =====================
+    def _set_autopilot(self, enabled: bool):
+        # El piloto sólo se consulta en los centros de celda donde Pac-Man
+        # decide: sigue la ruta y sólo busca al expandir el próximo tramo
+        self.autopilot = enabled
+        if enabled and self.pilot is None:
+            self.pilot = Autopilot(self.game, budget=self.plan_budget)
+        self.game.pacman.steer = self.pilot.steer if enabled else None
+
     def on_key_press(self, key, modifiers):
-        if not self.pacman:
+        if not self.game:
             return
+        if key in (arcade.key.UP, arcade.key.DOWN, arcade.key.LEFT, arcade.key.RIGHT):
+            # Tomar el control a mano apaga el autopiloto
+            self._set_autopilot(False)
         if key == arcade.key.UP:
-            self.pacman.set_direction(0, 1)
+            self.game.pacman.set_direction(0, 1)
         elif key == arcade.key.DOWN:
-            self.pacman.set_direction(0, -1)
+            self.game.pacman.set_direction(0, -1)
         elif key == arcade.key.LEFT:
-            self.pacman.set_direction(-1, 0)
+            self.game.pacman.set_direction(-1, 0)
         elif key == arcade.key.RIGHT:
-            self.pacman.set_direction(1, 0)
-        elif key == arcade.key.R and self.state != "PLAY":
+            self.game.pacman.set_direction(1, 0)
+        elif key == arcade.key.A:
+            self._set_autopilot(not self.autopilot)
+        elif key == arcade.key.T:
+            # Turbo: siguiente velocidad de TIME_SCALES
+            faster = [scale for scale in TIME_SCALES if scale > self.time_scale]
+            self.time_scale = faster[0] if faster else TIME_SCALES[0]
+        elif key == arcade.key.R and self.game.state != "PLAY":
             self.setup()
         elif key == arcade.key.ESCAPE:
             arcade.close_window()
@@ -491,7 +389,40 @@ class PacGPT5(arcade.Window):
 
 
 def main():
-    game = PacGPT5()
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument(
+        "--map",
+        type=Path,
+        help="archivo de texto con el mapa (se compila a <archivo>.pgc la primera vez)",
+    )
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=1,
+        help="ticks de simulación por tick de reloj real (p. ej. 10 o 100)",
+    )
+    parser.add_argument(
+        "--ghosts",
+        type=int,
+        help="número de fantasmas, repartidos entre las G del mapa (por defecto uno por G)",
+    )
+    parser.add_argument(
+        "--plan-budget",
+        type=float,
+        default=TOUR_BUDGET,
+        help="segundos para mejorar la ruta del autopiloto al empezar",
+    )
+    args = parser.parse_args()
+    if args.time_scale <= 0:
+        parser.error("--time-scale debe ser positivo")
+    if args.ghosts is not None and args.ghosts < 0:
+        parser.error("--ghosts no puede ser negativo")
+    if args.plan_budget < 0:
+        parser.error("--plan-budget no puede ser negativo")
+    level = load_level(args.map) if args.map else Level()
+    game = PacGPT5(
+        level, time_scale=args.time_scale, n_ghosts=args.ghosts, plan_budget=args.plan_budget
+    )
     game.setup()
     arcade.run()
 
@@ -0,0 +1,141 @@
+"""
+Autopiloto de Pac-Man: un recorrido precalculado que recoge todos los pellets.
+
+Al armarse, ``Autopilot`` ordena los pellets y power pellets que quedan con
+``plan_tour`` (óptimo con pocos objetivos; si no, vecino más cercano
+mejorado con 2-opt y Or-opt durante ``budget`` segundos). Ese orden se
+expande a celdas (``route``) un tramo a la vez, con el camino del grafo de
+cruces hasta el siguiente objetivo pendiente, cuando Pac-Man llega al final
+de lo ya expandido: armar el piloto no paga un A* por pellet, y cada tramo
+es una búsqueda corta que queda en ``legs``. Pac-Man lo consulta en cada
+centro de celda donde decide (``Pacman.steer``) y casi siempre sólo avanza
+un lugar en la ruta. Si Pac-Man aparece fuera de ella, por ejemplo al
+perder una vida, se vuelve a enganchar: camino más corto hasta el siguiente
+pellet pendiente de la ruta y, desde ahí, el resto del recorrido sin
+cambios. Una partida nueva del mismo nivel empieza igual, así que
+``restart`` reusa el orden inicial y los tramos de ``legs`` sin buscar nada.
+
+Los fantasmas no se tienen en cuenta.
+
+Ejemplo:
+
+    state = GameState(Level(), seed=0, n_ghosts=0)
+    pilot = Autopilot(state, budget=0.5)
+    state.pacman.steer = pilot.steer
+    while state.state == "PLAY":
+        state.advance()
+    print(state.state, state.tick, len(pilot.route) - 1, pilot.history)
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from pacman_core import EMPTY, Cell, Direction, GameState
+from pacman_graph import JunctionGraph
+from pacman_tour import TOUR_BUDGET, JunctionDistances, plan_tour
+
+
+class Autopilot:
+    """Ruta celda a celda por todos los pellets que quedan en ``state``."""
+
+    def __init__(
+        self,
+        state: GameState,
+        graph: Optional[JunctionGraph] = None,
+        budget: float = TOUR_BUDGET,
+    ):
+        self.state = state
+        self.level = state.level
+        self.graph = graph if graph is not None else JunctionGraph(state.level)
+        self.distances = JunctionDistances(self.graph)
+        self.budget = budget
+        # Caminos ya expandidos entre dos celdas, para esta y las siguientes partidas
+        self.legs: Dict[Tuple[Cell, Cell], List[Cell]] = {}
+        self.targets: List[Cell] = []  # objetivos en orden de visita
+        self.next_target = 0  # índice en ``targets`` del próximo tramo a expandir
+        self.route: List[Cell] = []
+        self.position = 0  # índice en ``route`` de la próxima celda donde decidir
+        self.history: List[Tuple[float, int]] = []  # largo del recorrido al planificar
+        self.plan()
+        # Con qué empezó la partida y en qué orden se planificó desde ahí
+        self.origin = (state.pacman.cell, bytes(state.items))
+        self.start_targets = self.targets
+
+    def restart(self, state: GameState):
+        """Sigue a ``state``, una partida nueva del mismo nivel; si empieza
+        igual que la anterior reusa su orden, si no planifica de nuevo."""
+        self.state = state
+        origin = (state.pacman.cell, bytes(state.items))
+        if origin != self.origin:
+            # armado a mitad de partida: el orden de esa partida no sirve
+            self.plan()
+            self.origin = origin
+            self.start_targets = self.targets
+            return
+        row, col = divmod(state.pacman.cell, self.level.cols)
+        self.targets = self.start_targets
+        self.next_target = 0
+        self.route = [(col, row)]
+        self.position = 0
+
+    def plan(self):
+        """Ordena los pellets que quedan desde la celda actual de Pac-Man."""
+        tour = plan_tour(self.state, self.budget, self.graph)
+        self.history = tour.history
+        row, col = divmod(self.state.pacman.cell, self.level.cols)
+        self.targets = tour.cells
+        self.next_target = 0
+        self.route = [(col, row)]
+        self.position = 0
+
+    def steer(self, index: int) -> Optional[Direction]:
+        """Movimiento desde la celda ``index`` hacia la siguiente de la ruta."""
+        cols = self.level.cols
+        cell = (index % cols, index // cols)
+        if self.position >= len(self.route) or self.route[self.position] != cell:
+            self._rejoin(cell)
+        self.position += 1
+        if self.position >= len(self.route) and not self._extend():
+            return None
+        col, row = self.route[self.position]
+        return col - cell[0], cell[1] - row
+
+    def _leg(self, a: Cell, b: Cell) -> List[Cell]:
+        leg = self.legs.get((a, b))
+        if leg is None:
+            leg = self.legs[a, b] = self.distances.path(a, b)
+        return leg
+
+    def _extend(self) -> bool:
+        # Agrega a la ruta el camino hasta el próximo objetivo que siga
+        # pendiente; lo que se comió de paso ya no hace falta visitarlo
+        cols = self.level.cols
+        items = self.state.items
+        while self.next_target < len(self.targets):
+            target = self.targets[self.next_target]
+            self.next_target += 1
+            if items[target[1] * cols + target[0]] == EMPTY:
+                continue
+            leg = self._leg(self.route[-1], target)
+            if leg:
+                self.route.extend(leg[1:])
+                return True
+        return False
+
+    def _rejoin(self, cell: Cell):
+        # Camino hasta el siguiente pellet pendiente de la ruta y, desde ahí,
+        # el resto de la ruta tal cual
+        cols = self.level.cols
+        items = self.state.items
+        rest = self.route[self.position :]
+        self.position = 0
+        for k, (col, row) in enumerate(rest):
+            if items[row * cols + col] == EMPTY:
+                continue
+            leg = self._leg(cell, (col, row))
+            if leg:
+                self.route = leg + rest[k + 1 :]
+            else:
+                self.plan()
+            return
+        # nada pendiente en lo ya expandido: el próximo tramo sale de aquí
+        self.route = [cell]
@@ -0,0 +1,269 @@
+"""
+Entorno por lotes de PacGPT5: N partidas independientes avanzadas a la vez
+con operaciones de NumPy.
+
+Cada paso mueve a Pac-Man exactamente una celda (lo que en la ventana son
+``TILE_SIZE / MOVEMENT_SPEED`` ticks) y los fantasmas se mueven una celda
+cada ``GHOST_PERIOD`` pasos, porque van a la mitad de velocidad. Las reglas
+de paredes son las de ``Pacman.can_move`` (cambiar a la dirección deseada si
+está libre, pararse si la actual está bloqueada) y las de pellets y power
+pellets son las de ``GameState.step``.
+
+Direcciones: índices de ``DIRECTIONS`` (0 derecha, 1 izquierda, 2 arriba,
+3 abajo) y ``STOP`` (4) para quedarse quieto. En ``step`` una acción
+negativa mantiene la dirección deseada anterior.
+
+Ejemplo:
+
+    env = BatchEnv(Level(), n_envs=512, seed=0)
+    rng = np.random.default_rng(0)
+    while not env.done.all():
+        rewards, done = env.step(rng.integers(0, 4, env.n_envs))
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from pacman_core import (
+    GHOST_SCORE,
+    GHOST_SPEED,
+    MOVEMENT_SPEED,
+    NO_MOVE,
+    PACMAN_LIVES,
+    PELLET,
+    PELLET_SCORE,
+    POWER,
+    POWER_TICKS,
+    STOP,
+    TILE_SIZE,
+    Level,
+)
+
+PLAY, WIN, LOSE = 0, 1, 2
+STATE_NAMES = ("PLAY", "WIN", "LOSE")
+
+TICKS_PER_STEP = TILE_SIZE // MOVEMENT_SPEED
+GHOST_PERIOD = MOVEMENT_SPEED // GHOST_SPEED  # pasos por celda de fantasma
+POWER_STEPS = -(-POWER_TICKS // TICKS_PER_STEP)
+
+
+def build_neighbor_table(level: Level) -> np.ndarray:
+    """Tabla (celdas, 5) con la celda destino de cada dirección y de STOP.
+
+    Se arma a partir de ``Level.neighbors``; un movimiento bloqueado (pared o
+    fuera del mapa) apunta a la propia celda.
+    """
+    n_cells = level.rows * level.cols
+    cells = np.arange(n_cells)
+    table = np.empty((n_cells, STOP + 1), dtype=np.int64)
+    table[:, :STOP] = np.frombuffer(level.neighbors, dtype=np.int32).reshape(n_cells, STOP)
+    table[:, STOP] = cells
+    blocked = table[:, :STOP] < 0
+    table[:, :STOP][blocked] = np.broadcast_to(cells[:, None], blocked.shape)[blocked]
+    return table
+
+
+class BatchEnv:
+    """N partidas de PacGPT5 guardadas como arreglos de forma (N, ...)."""
+
+    def __init__(self, level: Level, n_envs: int, seed: Optional[int] = None):
+        self.level = level
+        self.n_envs = n_envs
+        self.rng = np.random.default_rng(seed)
+        cols = level.cols
+        n_cells = level.rows * level.cols
+
+        self.neighbors = build_neighbor_table(level)
+        self.legal = self.neighbors[:, :STOP] != np.arange(n_cells)[:, None]
+
+        self.start = level.start[1] * cols + level.start[0]
+        # Campo BFS de cada spawn, armado una vez: da la celda a la que vuelve
+        # cada fantasma al reiniciar y su camino de vuelta cuando muere
+        home = [level.flow_field(r * cols + c) for c, r in level.ghost_spawns]
+        self.spawns = np.array([field.target for field in home], dtype=np.int32)
+        self.home_moves = np.array(
+            [field.next_move for field in home], dtype=np.uint8
+        ).reshape(len(home), n_cells)  # (fantasmas, celdas)
+        items = np.frombuffer(level.items, dtype=np.uint8)
+        self.initial_pellets = items == PELLET
+        self.initial_powers = items == POWER
+
+        n, g = n_envs, len(self.spawns)
+        self.env_ids = np.arange(n)
+        self.pacman = np.empty(n, dtype=np.int32)
+        self.pacman_dir = np.empty(n, dtype=np.int8)
+        self.desired_dir = np.empty(n, dtype=np.int8)
+        self.ghosts = np.empty((n, g), dtype=np.int32)
+        self.ghost_dir = np.empty((n, g), dtype=np.int8)
+        self.frightened = np.zeros((n, g), dtype=bool)
+        self.dead = np.zeros((n, g), dtype=bool)
+        self.power_timer = np.zeros(n, dtype=np.int32)  # pasos restantes
+        self.lives = np.zeros(n, dtype=np.int8)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.pellets = np.zeros((n, n_cells), dtype=bool)
+        self.powers = np.zeros((n, n_cells), dtype=bool)
+        self.remaining = np.zeros(n, dtype=np.int32)
+        self.state = np.zeros(n, dtype=np.int8)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.reset()
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.state != PLAY
+
+    def reset(self, mask: Optional[np.ndarray] = None):
+        """Reinicia las partidas marcadas en ``mask`` (todas si es None)."""
+        idx = self.env_ids if mask is None else self.env_ids[mask]
+        self.pellets[idx] = self.initial_pellets
+        self.powers[idx] = self.initial_powers
+        self.remaining[idx] = self.initial_pellets.sum() + self.initial_powers.sum()
+        self.lives[idx] = PACMAN_LIVES
+        self.score[idx] = 0
+        self.state[idx] = PLAY
+        self.steps[idx] = 0
+        self._reset_positions(idx)
+
+    def _reset_positions(self, idx: np.ndarray):
+        self.pacman[idx] = self.start
+        self.pacman_dir[idx] = STOP
+        self.desired_dir[idx] = STOP
+        self.power_timer[idx] = 0
+        self.ghosts[idx] = self.spawns
+        self.ghost_dir[idx] = self.rng.integers(0, STOP, (len(idx), len(self.spawns)))
+        self.frightened[idx] = False
+        self.dead[idx] = False
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Avanza todas las partidas en juego una celda.
+
+        ``actions`` tiene forma (N,) con índices de dirección; los valores
+        negativos mantienen la dirección deseada. Devuelve la recompensa
+        (puntos ganados en este paso) y el arreglo ``done``.
+        """
+        actions = np.asarray(actions)
+        playing = self.state == PLAY
+        idx = self.env_ids[playing]
+        score_before = self.score.copy()
+        if len(idx) == 0:
+            return np.zeros(self.n_envs, dtype=np.int32), self.done
+
+        self.steps[idx] += 1
+        act = actions[idx]
+        chosen = act >= 0
+        self.desired_dir[idx[chosen]] = act[chosen]
+
+        # Temporizador de poder
+        timer = self.power_timer[idx]
+        expiring = timer == 1
+        self.power_timer[idx] = np.maximum(timer - 1, 0)
+        if expiring.any():
+            ended = idx[expiring]
+            self.frightened[ended] &= self.dead[ended]
+
+        # Movimiento Pac-Man: dirección deseada si está libre (STOP siempre
+        # lo está: se queda en la celda), parar si la actual está bloqueada
+        pos = self.pacman[idx]
+        old_pos = pos
+        desired = self.desired_dir[idx]
+        current = self.pacman_dir[idx].astype(np.int64)
+        turn = (desired == STOP) | self.legal[pos, np.minimum(desired, STOP - 1)]
+        current = np.where(turn, desired, current)
+        blocked = (current < STOP) & ~self.legal[pos, np.minimum(current, STOP - 1)]
+        current[blocked] = STOP
+        pos = self.neighbors[pos, current]
+        self.pacman_dir[idx] = current
+        self.pacman[idx] = pos
+
+        # Comer pellets y power pellets
+        ate = self.pellets[idx, pos]
+        self.pellets[idx[ate], pos[ate]] = False
+        self.score[idx[ate]] += PELLET_SCORE
+        power = self.powers[idx, pos]
+        if power.any():
+            powered = idx[power]
+            self.powers[powered, pos[power]] = False
+            self.power_timer[powered] = POWER_STEPS
+            self.frightened[powered] = ~self.dead[powered]
+        self.remaining[idx] -= ate.astype(np.int32) + power
+
+        # Fantasmas (media velocidad)
+        g_old = self.ghosts[idx]
+        moving = self.steps[idx] % GHOST_PERIOD == 0
+        if moving.any() and self.ghosts.shape[1]:
+            midx = idx[moving]
+            self.ghosts[midx] = self._move_ghosts(midx)
+        g_new = self.ghosts[idx]
+
+        # Colisiones: misma celda o cruce de frente en el mismo paso
+        contact = (g_new == pos[:, None]) | (
+            (g_new == old_pos[:, None]) & (g_old == pos[:, None])
+        )
+        if contact.any():
+            dead = self.dead[idx]
+            frightened = self.frightened[idx]
+            eaten = contact & frightened & ~dead
+            if eaten.any():
+                rows, ghosts = np.nonzero(eaten)
+                self.dead[idx[rows], ghosts] = True
+                self.frightened[idx[rows], ghosts] = False
+                np.add.at(self.score, idx[rows], GHOST_SCORE)
+            caught = (contact & ~frightened & ~dead).any(axis=1)
+            if caught.any():
+                hit = idx[caught]
+                self.lives[hit] -= 1
+                over = self.lives[hit] <= 0
+                self.state[hit[over]] = LOSE
+                self._reset_positions(hit[~over])
+
+        won = (self.remaining[idx] == 0) & (self.state[idx] == PLAY)
+        self.state[idx[won]] = WIN
+        return self.score - score_before, self.done
+
+    def _move_ghosts(self, idx: np.ndarray) -> np.ndarray:
+        """Elige y aplica una dirección para cada fantasma de ``idx``.
+
+        Las mismas reglas que ``Ghosts`` en ``GameState``: vivos, el primer
+        paso del campo BFS hacia Pac-Man (``Level.flow_field``, uno por celda
+        de Pac-Man distinta y compartido por todas las partidas); asustados,
+        el de ``FlowField.flee_moves`` sobre ese campo; muertos, el camino
+        más corto a su spawn. Sin paso siguen en su dirección, y si está
+        bloqueada eligen una libre al azar.
+        """
+        cells = self.ghosts[idx]
+        g = cells.shape[1]
+        targets, which = np.unique(self.pacman[idx], return_inverse=True)
+        fields = [self.level.flow_field(int(target)) for target in targets]
+        chase = np.stack([field.next_move for field in fields])  # (destinos, celdas)
+        hop = chase[which[:, None], cells]
+        frightened = self.frightened[idx] & ~self.dead[idx]
+        for k in np.unique(which[frightened.any(axis=1)]):
+            rows, ghosts = np.nonzero(frightened & (which == k)[:, None])
+            hop[rows, ghosts] = fields[k].flee_moves(cells[rows, ghosts])
+        choice = np.where(hop != NO_MOVE, hop, self.ghost_dir[idx]).astype(np.int64)
+        home = self.home_moves[np.arange(g), cells]
+        going_home = self.dead[idx] & (home != NO_MOVE)
+        choice[going_home] = home[going_home]
+
+        # Dirección bloqueada: una libre al azar (STOP si no hay ninguna)
+        legal = self.legal[cells]  # (n, g, 4)
+        open_ = (choice < STOP) & np.take_along_axis(
+            legal, np.minimum(choice, STOP - 1)[..., None], axis=2
+        )[..., 0]
+        stuck = ~open_ & ~going_home
+        if stuck.any():
+            priority = legal[stuck] * (1.0 + self.rng.random((int(stuck.sum()), STOP)))
+            choice[stuck] = np.where(legal[stuck].any(axis=1), priority.argmax(axis=1), STOP)
+        self.ghost_dir[idx] = choice
+        new_cells = self.neighbors[cells, choice]
+
+        # Los muertos reviven al llegar a su spawn
+        home = self.dead[idx] & (new_cells == self.spawns[None, :])
+        if home.any():
+            rows, ghosts = np.nonzero(home)
+            self.dead[idx[rows], ghosts] = False
+            self.frightened[idx[rows], ghosts] = False
+        return new_cells
+
+    def state_names(self):
+        return [STATE_NAMES[s] for s in self.state]
@@ -0,0 +1,179 @@
+"""
+Compilación del mapa a un grafo de cruces y pasillos.
+
+Casi todas las celdas libres de un mapa de Pac-Man tienen exactamente dos
+salidas: son pasillos donde no hay nada que decidir. Este módulo convierte
+las tablas de movimiento de un ``Level`` en un grafo cuyos nodos son las
+celdas donde sí hay decisión (cruces, callejones sin salida y las celdas que
+se pidan explícitamente, como el inicio de Pac-Man) y cuyas aristas son los
+pasillos entre ellos, con su longitud y los pellets que contienen.
+
+Ejemplo:
+
+    level = Level()
+    graph = JunctionGraph(level, extra_nodes=[level.start])
+    node = graph.node_index[level.start]
+    for direction, edge_id, other in graph.exits(node):
+        corridor = graph.edges[edge_id]
+        print(direction, corridor.length, len(corridor.pellets), graph.nodes[other])
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from pacman_core import (
+    EMPTY,
+    MASK_DIRECTIONS,
+    Cell,
+    Direction,
+    GameState,
+    Level,
+)
+
+
+@dataclass(frozen=True)
+class Corridor:
+    """Pasillo entre los nodos ``a`` y ``b`` (pueden coincidir en un lazo)."""
+
+    a: int
+    b: int
+    length: int  # movimientos de a hasta b
+    cells: Tuple[Cell, ...]  # celdas interiores, en orden de a hacia b
+    moves: Tuple[Direction, ...]  # dirección de cada movimiento de a hacia b
+    pellets: Tuple[Cell, ...]  # celdas interiores con pellet o power pellet
+
+    def walk(self, node: int, direction: Direction) -> Tuple[Tuple[Direction, ...], Tuple[Cell, ...]]:
+        """Movimientos y celdas interiores al salir de ``node`` en ``direction``."""
+        if node == self.a and self.moves[0] == direction:
+            return self.moves, self.cells
+        return tuple((-dx, -dy) for dx, dy in reversed(self.moves)), tuple(reversed(self.cells))
+
+    def other(self, node: int) -> int:
+        return self.b if node == self.a else self.a
+
+
+class JunctionGraph:
+    """Grafo de cruces (nodos) y pasillos (aristas) de un ``Level``."""
+
+    def __init__(self, level: Level, extra_nodes: Iterable[Cell] = ()):
+        self.level = level
+        cols = level.cols
+        masks = level.move_masks
+        free = [index for index, wall in enumerate(level.walls) if wall == 0]
+        forced = {level.cell_index(c, r) for c, r in extra_nodes}
+
+        self.nodes: List[Cell] = []
+        self.node_index: Dict[Cell, int] = {}
+        self.edges: List[Corridor] = []
+        self.adjacency: List[List[Tuple[Direction, int, int]]] = []
+        # Celda interior de pasillo -> (arista, posición dentro de ``cells``)
+        self.corridor_of: Dict[Cell, Tuple[int, int]] = {}
+
+        for index in free:
+            if len(MASK_DIRECTIONS[masks[index]]) != 2 or index in forced:
+                self._add_node(index)
+        for node in range(len(self.nodes)):
+            self._walk_exits(node)
+        # Pasillos cerrados sin ningún cruce: se parte el ciclo en una celda
+        for index in free:
+            cell = (index % cols, index // cols)
+            if cell not in self.node_index and cell not in self.corridor_of:
+                self._walk_exits(self._add_node(index))
+
+    def _add_node(self, index: int) -> int:
+        cell = (index % self.level.cols, index // self.level.cols)
+        self.node_index[cell] = len(self.nodes)
+        self.nodes.append(cell)
+        self.adjacency.append([])
+        return len(self.nodes) - 1
+
+    def _walk_exits(self, node: int):
+        level = self.level
+        cols = level.cols
+        col, row = self.nodes[node]
+        taken = {d for d, _, _ in self.adjacency[node]}
+        for direction in MASK_DIRECTIONS[level.move_masks[row * cols + col]]:
+            if direction in taken:
+                continue
+            cells: List[Cell] = []
+            moves: List[Direction] = [direction]
+            current = _step((col, row), direction)
+            while current not in self.node_index:
+                cells.append(current)
+                back = (-moves[-1][0], -moves[-1][1])
+                options = MASK_DIRECTIONS[level.move_masks[current[1] * cols + current[0]]]
+                moves.append(next(d for d in options if d != back))
+                current = _step(current, moves[-1])
+            other = self.node_index[current]
+            arrival = (-moves[-1][0], -moves[-1][1])
+            edge_id = len(self.edges)
+            pellets = tuple(c for c in cells if level.items[c[1] * cols + c[0]] != EMPTY)
+            self.edges.append(Corridor(node, other, len(moves), tuple(cells), tuple(moves), pellets))
+            for position, cell in enumerate(cells):
+                self.corridor_of[cell] = (edge_id, position)
+            self.adjacency[node].append((direction, edge_id, other))
+            taken.add(direction)
+            if other == node:
+                taken.add(arrival)
+            if other != node or arrival != direction:
+                self.adjacency[other].append((arrival, edge_id, node))
+
+    def exits(self, node: int) -> List[Tuple[Direction, int, int]]:
+        """Movimientos macro desde un nodo: (dirección, arista, nodo destino)."""
+        return self.adjacency[node]
+
+    def remaining_pellets(self, edge_id: int, state: GameState) -> int:
+        """Pellets de la arista que siguen sin comerse en ``state``."""
+        cols = self.level.cols
+        return sum(1 for c, r in self.edges[edge_id].pellets if state.items[r * cols + c] != EMPTY)
+
+
+def _step(cell: Cell, direction: Direction) -> Cell:
+    # y positiva es arriba (fila menor)
+    return cell[0] + direction[0], cell[1] - direction[1]
+
+
+def follow_corridor(
+    state: GameState, graph: JunctionGraph, node: int, direction: Direction, max_ticks: int = 1 << 20
+) -> int:
+    """Lleva a Pac-Man por el pasillo que sale de ``node`` en ``direction``
+    hasta el nodo del otro extremo, girando en las curvas.
+
+    Usa ``GameState.advance`` parando en cada centro de celda, así que
+    recorre el pasillo saltando de celda en celda. Termina antes si la
+    partida acaba o Pac-Man sale del pasillo (por ejemplo, al perder una
+    vida). Devuelve los ticks simulados.
+    """
+    level = graph.level
+    edge_id, target = next((e, o) for d, e, o in graph.exits(node) if d == direction)
+    moves, cells = graph.edges[edge_id].walk(node, direction)
+    start = graph.nodes[node]
+    position = {cell: k for k, cell in enumerate((start,) + cells)}
+    goal = graph.nodes[target]
+
+    pacman = state.pacman
+    action = moves[0]
+    ticks = 0
+    left_start = False
+    while state.state == "PLAY" and ticks < max_ticks:
+        ticks += state.advance(action, max_ticks - ticks, until_center=True)
+        action = None
+        if not pacman.at_center:
+            continue
+        row, col = divmod(pacman.cell, level.cols)
+        cell = (col, row)
+        left_start = left_start or cell != start
+        if cell == goal and left_start:
+            break
+        k = position.get(cell)
+        if k is None:
+            break
+        action = moves[k]
+    return ticks
+
+
+if __name__ == "__main__":
+    level = Level()
+    graph = JunctionGraph(level, extra_nodes=[level.start])
+    n_free = sum(row.count(0) for row in level.walls_grid)
+    print(f"Celdas libres: {n_free}  nodos: {len(graph.nodes)}  pasillos: {len(graph.edges)}")
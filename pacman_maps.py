@@ -0,0 +1,182 @@
+"""
+Carga de mapas desde archivos de texto con una caché compilada al lado.
+
+Un archivo de mapa usa los mismos caracteres que ``RAW_MAP`` (``#`` pared,
+``.`` punto, ``o`` power pellet, ``P`` inicio de Pac-Man, ``G`` fantasma,
+espacio vacío), una fila por línea. También se aceptan filas copiadas de la
+lista de Python, entre comillas y con coma final, como en
+``SolucionesAlumnos/Manuel_Mendoza/map``.
+
+La primera vez que se carga un mapa se analiza el texto, se arma el
+``Level`` y sus tablas se escriben en ``<archivo>.pgc``: cabecera, spawns,
+pellets, power pellets, mapa de paredes, contenido de cada celda, máscaras
+de movimiento y tabla de vecinos. Las cargas siguientes abren ese archivo
+con ``mmap`` y el ``Level`` usa las tablas en su lugar, sin recorrer el mapa
+carácter por carácter. La caché se invalida sola si cambia el contenido del
+mapa (se guarda su SHA-1) o el formato.
+
+Ejemplo:
+
+    level = load_level("SolucionesAlumnos/Manuel_Mendoza/map")
+    state = GameState(level, seed=0)
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+from array import array
+from pathlib import Path
+from typing import List, Optional, Union
+
+from pacman_core import DIRECTIONS, Cell, Level
+
+COMPILED_SUFFIX = ".pgc"
+COMPILED_MAGIC = b"PGC\x00"
+COMPILED_VERSION = 1
+# magic, versión, filas, columnas, inicio (col, fila), nº de spawns,
+# pellets y power pellets, SHA-1 del texto
+_HEADER = struct.Struct("<4sIIIiiIII20s")
+_ALIGN = 8
+
+_QUOTED_ROW = re.compile(r"""^\s*(["'])(.*)\1\s*,?\s*$""")
+
+PathLike = Union[str, os.PathLike]
+
+
+def parse_map_text(text: str) -> List[str]:
+    """Filas del mapa a partir del contenido de un archivo.
+
+    Se ignoran las líneas en blanco al principio y al final.
+    """
+    rows = []
+    for line in text.splitlines():
+        quoted = _QUOTED_ROW.match(line)
+        rows.append(quoted.group(2) if quoted else line)
+    while rows and not rows[-1].strip():
+        rows.pop()
+    while rows and not rows[0].strip():
+        rows.pop(0)
+    return rows
+
+
+def compiled_path(path: PathLike) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + COMPILED_SUFFIX)
+
+
+def load_level(path: PathLike, use_cache: bool = True) -> Level:
+    """``Level`` del archivo ``path``, usando o creando su caché compilada.
+
+    Si la caché no se puede escribir (directorio de sólo lectura, por
+    ejemplo) el mapa se carga igual, sólo que sin guardarla.
+    """
+    data = Path(path).read_bytes()
+    digest = hashlib.sha1(data).digest()
+    raw_map = parse_map_text(data.decode("utf-8"))
+    if not use_cache:
+        return Level(raw_map)
+
+    cache = compiled_path(path)
+    level = _open_compiled(cache, raw_map, digest)
+    if level is None:
+        level = Level(raw_map)
+        try:
+            write_compiled(level, cache, digest)
+        except OSError:
+            pass
+    return level
+
+
+# ===================== FORMATO COMPILADO =====================
+def _padding(size: int) -> bytes:
+    return bytes(-size % _ALIGN)
+
+
+def _cell_indices(level: Level, cells: List[Cell]) -> array:
+    return array("i", [r * level.cols + c for c, r in cells])
+
+
+def write_compiled(level: Level, path: PathLike, digest: bytes):
+    """Escribe las tablas de ``level`` en ``path`` (de forma atómica)."""
+    spawns = array("i", [v for cell in level.ghost_spawns for v in cell])
+    sections = [
+        spawns.tobytes(),
+        _cell_indices(level, level.pellet_cells).tobytes(),
+        _cell_indices(level, level.power_cells).tobytes(),
+        bytes(level.walls),
+        bytes(level.items),
+        bytes(level.move_masks),
+        bytes(level.neighbors),
+    ]
+    header = _HEADER.pack(
+        COMPILED_MAGIC,
+        COMPILED_VERSION,
+        level.rows,
+        level.cols,
+        level.start[0],
+        level.start[1],
+        len(level.ghost_spawns),
+        len(level.pellet_cells),
+        len(level.power_cells),
+        digest,
+    )
+    path = Path(path)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(header + _padding(len(header)))
+        for section in sections:
+            f.write(section + _padding(len(section)))
+    os.replace(tmp, path)
+
+
+def _open_compiled(path: Path, raw_map: List[str], digest: bytes) -> Optional[Level]:
+    """Level con las tablas de ``path`` en mmap, o None si falta o no sirve."""
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # no existe o está vacío
+        return None
+    header = _HEADER.unpack_from(buffer) if len(buffer) >= _HEADER.size else None
+    if header is None or header[:2] != (COMPILED_MAGIC, COMPILED_VERSION) or header[-1] != digest:
+        buffer.close()
+        return None
+    _, _, rows, cols, start_col, start_row, n_spawns, n_pellets, n_powers, _ = header
+    n_cells = rows * cols
+    sizes = [
+        (2 * n_spawns, "i"),
+        (n_pellets, "i"),
+        (n_powers, "i"),
+        (n_cells, "B"),  # paredes
+        (n_cells, "B"),  # contenido
+        (n_cells, "B"),  # máscaras
+        (n_cells * len(DIRECTIONS), "i"),  # vecinos
+    ]
+    offset = _HEADER.size + len(_padding(_HEADER.size))
+    bounds = []
+    for count, fmt in sizes:
+        size = count * struct.calcsize(fmt)
+        bounds.append((offset, offset + size, fmt))
+        offset += size + len(_padding(size))
+    if offset != len(buffer):
+        buffer.close()
+        return None
+
+    view = memoryview(buffer)
+    spawns, pellets, powers, walls, items, move_masks, neighbors = (
+        view[start:end].cast(fmt) for start, end, fmt in bounds
+    )
+
+    ghost_spawns: List[Cell] = list(zip(spawns[0::2], spawns[1::2]))
+    return Level.from_tables(
+        raw_map,
+        walls=walls,
+        items=items,
+        move_masks=move_masks,
+        neighbors=neighbors,
+        pellet_indices=pellets,
+        power_indices=powers,
+        ghost_spawns=ghost_spawns,
+        start=(start_col, start_row),
+    )
@@ -0,0 +1,215 @@
+"""
+Distancias en el laberinto precalculadas por mapa.
+
+Los agentes, la persecución de los fantasmas y el orden de recolección de
+pellets preguntan una y otra vez por distancias sobre el mismo laberinto
+estático. ``DistanceTable`` las calcula una sola vez:
+
+- Mapas medianos (hasta ``APSP_MAX_CELLS`` celdas libres): matriz de
+  distancias entre todas las parejas de celdas libres (int16) y tabla de
+  primer movimiento (uint8, índice de ``DIRECTIONS``). Ambas se guardan en
+  disco con el hash del mapa como nombre y las siguientes ejecuciones las
+  abren con ``mmap`` en lugar de recalcularlas.
+- Mapas grandes: árboles BFS por destino calculados bajo demanda y
+  guardados en una caché LRU acotada.
+
+Las distancias se miden en movimientos entre celdas; -1 significa que no hay
+camino.
+
+Ejemplo:
+
+    table = DistanceTable(Level())
+    table.distance((1, 8), (20, 8))
+    table.next_step((1, 8), (20, 8))   # -> (1, 0)
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from pacman_core import (
+    DIRECTIONS,
+    NO_MOVE,
+    STOP_DIR,
+    Cell,
+    Direction,
+    Level,
+    bfs_distances,
+    first_moves,
+    neighbor_array,
+)
+
+APSP_MAX_CELLS = 4096  # int16 + uint8 => ~80 MB en el peor caso
+BFS_CACHE_SIZE = 256
+CACHE_DIR = Path(__file__).resolve().parent / ".pacman_cache"
+CACHE_VERSION = 1
+
+
+def map_hash(level: Level) -> str:
+    """Hash del contenido del mapa, usado como clave de las cachés en disco."""
+    digest = hashlib.sha1(f"v{CACHE_VERSION}:{level.cols}x{level.rows}\n".encode())
+    digest.update("\n".join(level.raw_map).encode())
+    return digest.hexdigest()
+
+
+class DistanceTable:
+    """Distancias y primer movimiento entre celdas libres de un ``Level``."""
+
+    def __init__(
+        self,
+        level: Level,
+        cache_dir: Optional[Path] = CACHE_DIR,
+        max_cells: int = APSP_MAX_CELLS,
+        cache_size: int = BFS_CACHE_SIZE,
+    ):
+        self.level = level
+        self.neighbors = neighbor_array(level)
+        n_cells = level.rows * level.cols
+        free = np.frombuffer(level.walls, dtype=np.uint8) == 0
+        self.free_cells = np.flatnonzero(free).astype(np.int32)
+        # Celda -> posición en free_cells (-1 en paredes)
+        self.slot_of = np.full(n_cells, -1, dtype=np.int32)
+        self.slot_of[self.free_cells] = np.arange(len(self.free_cells), dtype=np.int32)
+
+        self.dist: Optional[np.ndarray] = None  # (F, F) int16
+        self.next_move: Optional[np.ndarray] = None  # (F, F) uint8
+        self._trees: "OrderedDict[int, tuple]" = OrderedDict()
+        self.cache_size = cache_size
+        if len(self.free_cells) <= max_cells:
+            self._load_or_build(cache_dir)
+
+    # ===================== TABLA COMPLETA =====================
+    def _load_or_build(self, cache_dir: Optional[Path]):
+        if cache_dir is not None:
+            base = Path(cache_dir) / map_hash(self.level)
+            dist_path = base.with_suffix(".dist.npy")
+            next_path = base.with_suffix(".next.npy")
+            if dist_path.exists() and next_path.exists():
+                self.dist = np.load(dist_path, mmap_mode="r")
+                self.next_move = np.load(next_path, mmap_mode="r")
+                return
+        self.dist, self.next_move = self._all_pairs()
+        if cache_dir is not None:
+            # Sin permiso de escritura (checkout de sólo lectura, por ejemplo)
+            # la tabla se queda sólo en memoria
+            try:
+                Path(cache_dir).mkdir(parents=True, exist_ok=True)
+                _save_atomic(dist_path, self.dist)
+                _save_atomic(next_path, self.next_move)
+            except OSError:
+                pass
+
+    def _all_pairs(self):
+        """BFS desde todas las fuentes a la vez.
+
+        El frente es una lista de parejas (fuente, celda); cada pareja se
+        visita una sola vez, así que el trabajo total es O(F²) sin importar
+        el diámetro del laberinto.
+        """
+        n_free = len(self.free_cells)
+        # vecinos expresados como posiciones en free_cells; n_free = sin vecino
+        nbr = self.neighbors[self.free_cells]
+        nbr_slot = np.where(nbr >= 0, self.slot_of[np.maximum(nbr, 0)], n_free)
+        flat = np.full(n_free * n_free, -1, dtype=np.int16)
+        claim = np.empty(n_free * n_free, dtype=np.int32)
+        src = np.arange(n_free, dtype=np.int64)
+        cur = src.copy()
+        flat[src * n_free + cur] = 0
+        depth = 0
+        while src.size:
+            depth += 1
+            src = np.repeat(src, len(DIRECTIONS))
+            cur = nbr_slot[cur].ravel()
+            keep = cur < n_free
+            src, cur = src[keep], cur[keep]
+            lin = src * n_free + cur
+            keep = flat[lin] < 0
+            src, cur, lin = src[keep], cur[keep], lin[keep]
+            flat[lin] = depth
+            # quitar parejas repetidas: sólo sigue la última que escribió
+            order = np.arange(len(lin), dtype=np.int32)
+            claim[lin] = order
+            keep = claim[lin] == order
+            src, cur = src[keep], cur[keep]
+        dist = flat.reshape(n_free, n_free)
+
+        next_move = np.full((n_free, n_free), NO_MOVE, dtype=np.uint8)
+        for d in reversed(range(len(DIRECTIONS))):
+            has = nbr_slot[:, d] < n_free
+            rows = np.flatnonzero(has)
+            via = dist[nbr_slot[rows, d]]  # distancia desde el vecino
+            here = dist[rows]
+            ok = (here > 0) & (via == here - 1)
+            sub = next_move[rows]
+            sub[ok] = d
+            next_move[rows] = sub
+        return dist, next_move
+
+    # ===================== ÁRBOLES BFS (LRU) =====================
+    def _tree(self, target: int):
+        tree = self._trees.get(target)
+        if tree is not None:
+            self._trees.move_to_end(target)
+            return tree
+        dist = bfs_distances(self.neighbors, [target])
+        tree = (dist, first_moves(self.neighbors, dist))
+        self._trees[target] = tree
+        if len(self._trees) > self.cache_size:
+            self._trees.popitem(last=False)
+        return tree
+
+    # ===================== CONSULTAS =====================
+    def field(self, target: Cell) -> np.ndarray:
+        """Distancias de todas las celdas (índice row * cols + col) a ``target``."""
+        index = self.level.cell_index(*target)
+        if self.dist is None:
+            return self._tree(index)[0]
+        out = np.full(len(self.slot_of), -1, dtype=np.int32)
+        out[self.free_cells] = self.dist[self.slot_of[index]]
+        return out
+
+    def distance(self, a: Cell, b: Cell) -> int:
+        ia, ib = self.level.cell_index(*a), self.level.cell_index(*b)
+        if self.dist is None:
+            return int(self._tree(ib)[0][ia])
+        sa, sb = self.slot_of[ia], self.slot_of[ib]
+        if sa < 0 or sb < 0:
+            return -1
+        return int(self.dist[sa, sb])
+
+    def next_step(self, a: Cell, b: Cell) -> Direction:
+        """Primer movimiento de un camino más corto de ``a`` a ``b``."""
+        ia, ib = self.level.cell_index(*a), self.level.cell_index(*b)
+        if self.dist is None:
+            move = self._tree(ib)[1][ia]
+        else:
+            sa, sb = self.slot_of[ia], self.slot_of[ib]
+            move = NO_MOVE if sa < 0 or sb < 0 else self.next_move[sa, sb]
+        return STOP_DIR if move == NO_MOVE else DIRECTIONS[move]
+
+    def path(self, a: Cell, b: Cell) -> List[Cell]:
+        """Celdas de un camino más corto de ``a`` a ``b``, ambas incluidas
+        (lista vacía si no hay camino)."""
+        if self.distance(a, b) < 0:
+            return []
+        cells = [a]
+        while cells[-1] != b:
+            col, row = cells[-1]
+            dx, dy = self.next_step(cells[-1], b)
+            cells.append((col + dx, row - dy))  # y positiva es arriba (fila menor)
+        return cells
+
+
+def _save_atomic(path: Path, array: np.ndarray):
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
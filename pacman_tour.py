@@ -0,0 +1,705 @@
+"""
+Orden de recolección de pellets: exacto para pocos objetivos, heurístico
+para muchos.
+
+Recoger todos los pellets empezando en la celda de Pac-Man es un camino
+hamiltoniano abierto sobre la matriz de distancias en el laberinto entre el
+inicio y los pellets (las distancias salen de ``DistanceTable``). Pasar por
+encima de otros pellets no cambia nada: cualquier camino que los visite
+todos mide al menos la suma de las distancias entre primeras visitas
+consecutivas.
+
+``held_karp`` resuelve ese problema de forma exacta con programación
+dinámica sobre subconjuntos (máscaras de bits): ``dp[máscara, j]`` es el
+camino más corto que sale del inicio, visita exactamente los objetivos de
+``máscara`` y termina en ``j``. Las máscaras se procesan por capas (número
+de bits) y cada capa se calcula con operaciones de NumPy en bloques de como
+mucho ``HELD_KARP_CHUNK`` filas, así que la memoria temporal queda acotada.
+La tabla completa usa el entero más chico que alcance (int16 o int32) y no
+se guardan punteros: el camino se reconstruye desde la tabla. Hasta unos 20
+objetivos tarda segundos; sirve como referencia del óptimo para comparar
+otros planificadores.
+
+Con miles de pellets ``TourOptimizer`` trabaja sobre el grafo de cruces y
+pasillos (``JunctionGraph``): las distancias salen de un A* entre nodos
+(``JunctionDistances``) y cada objetivo guarda la lista de sus vecinos más
+cercanos. Arma un recorrido por vecino más cercano y lo mejora con
+movimientos 2-opt y Or-opt limitados a esas listas hasta llegar a un óptimo
+local o agotar el presupuesto de tiempo; ``TourPlan.history`` registra el
+largo tras cada pasada, para elegir cuánto esperar al empezar.
+
+Ejemplo:
+
+    state = GameState(Level(), seed=0)
+    length, cells = exact_tour(state)   # pocos pellets; si no, MemoryError
+    plan = plan_tour(state, budget=0.5)  # cualquier cantidad
+
+    python pacman_tour.py --targets 16 --seed 0
+    python pacman_tour.py --map mapa.txt --targets 0 --budget 2
+"""
+
+import argparse
+import heapq
+import math
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pacman_core import EMPTY, Cell, GameState, Level
+from pacman_graph import JunctionGraph
+from pacman_maps import load_level
+from pacman_paths import DistanceTable
+
+HELD_KARP_MAX_BYTES = 1 << 30  # dp y máscaras; con int16 alcanza para 24 objetivos
+HELD_KARP_CHUNK = 1 << 16  # filas de dp por bloque al calcular una capa
+EXACT_TOUR_TARGETS = 12  # hasta aquí plan_tour usa Held-Karp
+TOUR_NEIGHBORS = 8  # vecinos más cercanos por objetivo para 2-opt y Or-opt
+TOUR_BUDGET = 1.0  # segundos para mejorar el recorrido
+OR_OPT_SEGMENTS = (1, 2, 3)
+INF = 1 << 60
+
+
+def distance_matrix(table: DistanceTable, cells: Sequence[Cell]) -> np.ndarray:
+    """Distancias en el laberinto (int32, -1 sin camino) entre todas las ``cells``."""
+    index = np.array([table.level.cell_index(*cell) for cell in cells], dtype=np.int64)
+    return np.array([table.field(cell)[index] for cell in cells], dtype=np.int32).reshape(
+        len(cells), len(cells)
+    )
+
+
+def tour_length(dist: np.ndarray, order: Sequence[int]) -> int:
+    """Largo del camino que recorre los nodos de ``order`` en ese orden."""
+    order = np.asarray(order)
+    return int(dist[order[:-1], order[1:]].sum())
+
+
+def greedy_order(dist: np.ndarray) -> List[int]:
+    """Vecino más cercano desde el nodo 0 (la referencia que se quiere mejorar)."""
+    n = len(dist)
+    left = np.ones(n, dtype=bool)
+    left[0] = False
+    order = [0]
+    while left.any():
+        row = np.where(left & (dist[order[-1]] >= 0), dist[order[-1]], np.iinfo(np.int32).max)
+        order.append(int(row.argmin()))
+        left[order[-1]] = False
+    return order
+
+
+def held_karp(
+    dist: np.ndarray,
+    max_bytes: int = HELD_KARP_MAX_BYTES,
+    chunk: int = HELD_KARP_CHUNK,
+) -> Tuple[int, List[int]]:
+    """Camino más corto que sale del nodo 0 y visita todos los demás.
+
+    ``dist`` es una matriz (n, n) de distancias no negativas. Devuelve el
+    largo y el orden de los nodos (empezando por 0). Lanza ``MemoryError``
+    si la tabla no cabe en ``max_bytes`` y ``ValueError`` si algún nodo es
+    inalcanzable.
+    """
+    dist = np.asarray(dist)
+    k = len(dist) - 1  # objetivos, sin contar el inicio
+    if k <= 0:
+        return 0, [0]
+    if (dist < 0).any():
+        raise ValueError("La matriz tiene nodos inalcanzables (-1)")
+    # INF es la mitad del máximo del tipo: INF + una distancia no desborda
+    dtype = np.int16 if int(dist.max()) * (k + 1) < np.iinfo(np.int16).max // 2 else np.int32
+    inf = np.iinfo(dtype).max // 2
+    itemsize = np.dtype(dtype).itemsize
+    need = (
+        (1 << k) * (k * itemsize + 8 + 1)  # dp, masks (int64) y bits (uint8)
+        + 2 * 8 * math.comb(k, k // 2)  # layer y ending de la capa más grande
+        + 2 * min(chunk, 1 << k) * k * itemsize  # dp[block ^ ...] y su suma
+    )
+    if need > max_bytes:
+        raise MemoryError(
+            f"Held-Karp con {k} objetivos necesita {need / 2**20:.0f} MB "
+            f"(límite {max_bytes / 2**20:.0f} MB)"
+        )
+
+    between = dist[1:, 1:].astype(dtype)
+    dp = np.full((1 << k, k), inf, dtype=dtype)
+    targets = np.arange(k)
+    dp[1 << targets, targets] = dist[0, 1:]
+    masks = np.arange(1 << k, dtype=np.int64)
+    bits = np.bitwise_count(masks)
+    for size in range(2, k + 1):
+        layer = masks[bits == size]
+        for j in range(k):
+            ending = layer[(layer >> j) & 1 == 1]
+            for lo in range(0, len(ending), chunk):
+                block = ending[lo : lo + chunk]
+                # llegar a j desde el mejor final i del subconjunto sin j
+                best = (dp[block ^ (1 << j)] + between[:, j]).min(axis=1)
+                dp[block, j] = np.minimum(best, inf)
+
+    # Reconstrucción: el final i previo es el que explica dp[máscara, j]
+    mask = (1 << k) - 1
+    j = int(dp[mask].argmin())
+    length = int(dp[mask, j])
+    path = [j]
+    while mask != 1 << j:
+        mask ^= 1 << j
+        j = int((dp[mask].astype(np.int64) + between[:, j]).argmin())
+        path.append(j)
+    return length, [0] + [node + 1 for node in reversed(path)]
+
+
+def exact_tour(
+    state: GameState,
+    table: Optional[DistanceTable] = None,
+    max_bytes: int = HELD_KARP_MAX_BYTES,
+) -> Tuple[int, List[Cell]]:
+    """Orden óptimo de los pellets y power pellets que quedan en ``state``,
+    desde la celda de Pac-Man. Los inalcanzables se ignoran.
+
+    Devuelve el largo en movimientos y las celdas en orden de visita.
+    """
+    level = state.level
+    table = table if table is not None else DistanceTable(level)
+    row, col = divmod(state.pacman.cell, level.cols)
+    start = (col, row)
+    reach = table.field(start)
+    targets = [
+        (index % level.cols, index // level.cols)
+        for index, item in enumerate(state.items)
+        if item != EMPTY and reach[index] > 0
+    ]
+    cells = [start] + targets
+    length, order = held_karp(distance_matrix(table, cells), max_bytes)
+    return length, [cells[i] for i in order[1:]]
+
+
+# ===================== MUCHOS OBJETIVOS =====================
+class JunctionDistances:
+    """Distancias y caminos entre celdas libres sobre un ``JunctionGraph``.
+
+    Una celda interior de pasillo se engancha a los dos extremos de su
+    arista; la búsqueda es A* sobre los nodos con la distancia Manhattan
+    como cota (un pasillo nunca es más corto que ella). ``distance`` no
+    busca cuando las dos celdas están cerca en el mismo pasillo o a los
+    lados de un mismo nodo.
+    """
+
+    def __init__(self, graph: JunctionGraph):
+        self.graph = graph
+
+    def anchors(self, cell: Cell) -> List[Tuple[int, int, int]]:
+        """(nodo, movimientos hasta él, lado) para salir de ``cell``.
+
+        El lado es 0 si el nodo es el extremo ``a`` del pasillo de ``cell``
+        y 1 si es ``b``; distingue los dos sentidos de un lazo.
+        """
+        graph = self.graph
+        node = graph.node_index.get(cell)
+        if node is not None:
+            return [(node, 0, 0)]
+        edge_id, position = graph.corridor_of[cell]
+        edge = graph.edges[edge_id]
+        return [(edge.a, position + 1, 0), (edge.b, edge.length - position - 1, 1)]
+
+    def _search(self, a: Cell, b: Cell):
+        graph = self.graph
+        best, goal_node = INF, None
+        ea, eb = graph.corridor_of.get(a), graph.corridor_of.get(b)
+        if ea is not None and eb is not None and ea[0] == eb[0]:
+            best = abs(ea[1] - eb[1])
+        goal: Dict[int, Tuple[int, int]] = {}
+        for node, offset, side in self.anchors(b):
+            if node not in goal or offset < goal[node][0]:
+                goal[node] = (offset, side)
+        bc, br = b
+
+        def bound(node: int) -> int:
+            col, row = graph.nodes[node]
+            return abs(col - bc) + abs(row - br)
+
+        g: Dict[int, int] = {}
+        parent: Dict[int, tuple] = {}
+        heap = []
+        for node, offset, side in self.anchors(a):
+            if offset < g.get(node, INF):
+                g[node] = offset
+                parent[node] = (None, side)
+                heapq.heappush(heap, (offset + bound(node), offset, node))
+        done = set()
+        while heap:
+            f, d, node = heapq.heappop(heap)
+            if f >= best:
+                break
+            if node in done:
+                continue
+            done.add(node)
+            if node in goal and d + goal[node][0] < best:
+                best, goal_node = d + goal[node][0], node
+            for direction, edge_id, other in graph.adjacency[node]:
+                nd = d + graph.edges[edge_id].length
+                if nd < g.get(other, INF):
+                    g[other] = nd
+                    parent[other] = (node, direction, edge_id)
+                    heapq.heappush(heap, (nd + bound(other), nd, other))
+        return best, goal_node, goal, parent
+
+    def distance(self, a: Cell, b: Cell) -> int:
+        """Movimientos de ``a`` a ``b`` (-1 si no hay camino)."""
+        if a == b:
+            return 0
+        near = self._near(a, b)
+        if near is not None:
+            return near
+        best = self._search(a, b)[0]
+        return -1 if best >= INF else best
+
+    def _near(self, a: Cell, b: Cell) -> Optional[int]:
+        # Distancia sin buscar cuando es seguro que un camino corto obvio es
+        # el más corto: si mide lo mismo que la distancia Manhattan, o si va
+        # por el mismo pasillo a lo sumo a media vuelta, o por un mismo nodo
+        # con cada celda en la mitad de su pasillo que da a él (cualquier
+        # otro camino sale por el extremo lejano de alguno)
+        graph = self.graph
+        manhattan = abs(a[0] - b[0]) + abs(a[1] - b[1])
+        ea, eb = graph.corridor_of.get(a), graph.corridor_of.get(b)
+        if ea is not None and eb is not None and ea[0] == eb[0]:
+            gap = abs(ea[1] - eb[1])
+            return gap if gap == manhattan or 2 * gap <= graph.edges[ea[0]].length else None
+        length_a = graph.edges[ea[0]].length if ea is not None else 0
+        length_b = graph.edges[eb[0]].length if eb is not None else 0
+        ends_b = self.anchors(b)
+        for na, oa, _ in self.anchors(a):
+            for nb, ob, _ in ends_b:
+                if nb == na and (
+                    oa + ob == manhattan or (2 * oa <= length_a and 2 * ob <= length_b)
+                ):
+                    return oa + ob
+            # un solo pasillo entre los dos nodos
+            for _, edge_id, other in graph.adjacency[na]:
+                for nb, ob, _ in ends_b:
+                    if nb == other and oa + graph.edges[edge_id].length + ob == manhattan:
+                        return manhattan
+        return None
+
+    def path(self, a: Cell, b: Cell) -> List[Cell]:
+        """Celdas de un camino más corto de ``a`` a ``b``, ambas incluidas
+        (lista vacía si no hay camino)."""
+        if a == b:
+            return [a]
+        graph = self.graph
+        best, goal_node, goal, parent = self._search(a, b)
+        if best >= INF:
+            return []
+        if goal_node is None:  # mismo pasillo, sin pasar por ningún nodo
+            edge_id, pa = graph.corridor_of[a]
+            pb = graph.corridor_of[b][1]
+            cells = graph.edges[edge_id].cells
+            return list(cells[pa : pb + 1] if pa <= pb else cells[pb : pa + 1][::-1])
+
+        hops = []
+        node = goal_node
+        while parent[node][0] is not None:
+            prev, direction, edge_id = parent[node]
+            hops.append((prev, direction, edge_id, node))
+            node = prev
+        cells = [] if a in graph.node_index else self._to_node(a, parent[node][1])
+        cells.append(graph.nodes[node])
+        for prev, direction, edge_id, node in reversed(hops):
+            cells.extend(graph.edges[edge_id].walk(prev, direction)[1])
+            cells.append(graph.nodes[node])
+        if b not in graph.node_index:
+            cells.extend(self._to_node(b, goal[goal_node][1])[::-1])
+        return cells
+
+    def _to_node(self, cell: Cell, side: int) -> List[Cell]:
+        # Celdas interiores desde ``cell`` (incluida) hasta el nodo del lado
+        # ``side``, sin el nodo
+        edge_id, position = self.graph.corridor_of[cell]
+        cells = self.graph.edges[edge_id].cells
+        return list(cells[position::-1] if side == 0 else cells[position:])
+
+
+@dataclass
+class TourPlan:
+    """Orden de visita y cómo fue mejorando su largo."""
+
+    cells: List[Cell]  # objetivos en orden de visita, sin el inicio
+    length: int  # movimientos desde el inicio
+    history: List[Tuple[float, int]]  # (segundos desde el comienzo, largo)
+
+
+class TourOptimizer:
+    """Recorrido de muchos objetivos mejorado con 2-opt y Or-opt.
+
+    El recorrido es un camino abierto que empieza en ``start`` (el nodo 0,
+    que no se mueve). Cada objetivo guarda sus ``neighbors`` vecinos más
+    cercanos, calculados con un Dijkstra acotado sobre el grafo de cruces;
+    los movimientos sólo prueban esos candidatos y las distancias que hagan
+    falta se piden a ``JunctionDistances`` y quedan en caché. Las listas se
+    arman dentro de ``solve``, a cuenta del mismo presupuesto de tiempo.
+    """
+
+    def __init__(
+        self,
+        graph: JunctionGraph,
+        start: Cell,
+        targets: Sequence[Cell],
+        neighbors: int = TOUR_NEIGHBORS,
+    ):
+        self.graph = graph
+        self.distances = JunctionDistances(graph)
+        reachable = self._reachable_nodes(start)
+        self.cells: List[Cell] = [start] + [
+            cell
+            for cell in dict.fromkeys(targets)
+            if cell != start and any(n in reachable for n, _, _ in self.distances.anchors(cell))
+        ]
+        # Objetivos por nodo y por arista (ordenados por posición)
+        self._on_node: Dict[int, List[int]] = {}
+        self._on_edge: Dict[int, List[Tuple[int, int]]] = {}
+        for target, cell in enumerate(self.cells):
+            node = graph.node_index.get(cell)
+            if node is not None:
+                self._on_node.setdefault(node, []).append(target)
+            else:
+                edge_id, position = graph.corridor_of[cell]
+                self._on_edge.setdefault(edge_id, []).append((position, target))
+        for entries in self._on_edge.values():
+            entries.sort()
+        self._cache: Dict[Tuple[int, int], int] = {}
+        self.k = neighbors
+        # Listas de vecinos; None hasta que build_neighbors llega al objetivo
+        self.neighbors: List[Optional[List[int]]] = [None] * len(self.cells)
+
+    def build_neighbors(self, deadline: float = INF) -> bool:
+        """Arma las listas de vecinos que falten hasta ``deadline``
+        (``time.perf_counter``). Devuelve si quedaron todas."""
+        for target, listed in enumerate(self.neighbors):
+            if listed is not None:
+                continue
+            if time.perf_counter() > deadline:
+                return False
+            found = self.nearest(target, self.k)
+            self.neighbors[target] = [other for _, other in found]
+            for d, other in found:
+                self._cache[min(target, other), max(target, other)] = d
+        return True
+
+    def _reachable_nodes(self, start: Cell) -> set:
+        stack = [node for node, _, _ in self.distances.anchors(start)]
+        seen = set(stack)
+        while stack:
+            for _, _, other in self.graph.adjacency[stack.pop()]:
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        return seen
+
+    def distance(self, i: int, j: int) -> int:
+        key = (i, j) if i < j else (j, i)
+        d = self._cache.get(key)
+        if d is None:
+            d = self._cache[key] = self.distances.distance(self.cells[i], self.cells[j])
+        return d
+
+    def length(self, tour: Sequence[int]) -> int:
+        return sum(self.distance(a, b) for a, b in zip(tour, tour[1:]))
+
+    def nearest(
+        self, target: int, k: int, wanted: Optional[Callable[[int], bool]] = None
+    ) -> List[Tuple[int, int]]:
+        """Hasta ``k`` objetivos más cercanos a ``target`` que cumplan
+        ``wanted``, como (distancia, objetivo) de menor a mayor."""
+        graph = self.graph
+        wanted = wanted or (lambda other: True)
+        found: Dict[int, int] = {}
+        limit = [INF]  # distancia del k-ésimo encontrado
+
+        def offer(other: int, d: int):
+            if other != target and d < found.get(other, INF) and wanted(other):
+                found[other] = d
+                if len(found) >= k:
+                    limit[0] = heapq.nsmallest(k, found.values())[-1]
+
+        def scan(entries, distances):
+            # ``entries`` ya va en orden de distancia creciente
+            hits = 0
+            for (position, other), d in zip(entries, distances):
+                if hits >= k or d >= limit[0]:
+                    return
+                if other != target and wanted(other):
+                    offer(other, d)
+                    hits += 1
+
+        cell = self.cells[target]
+        here = graph.corridor_of.get(cell)
+        if here is not None:
+            edge_id, p = here
+            entries = self._on_edge[edge_id]
+            at = bisect_left(entries, (p, target))
+            after, before = entries[at + 1 :], entries[:at][::-1]
+            scan(after, (q - p for q, _ in after))
+            scan(before, (p - q for q, _ in before))
+
+        g: Dict[int, int] = {}
+        for node, offset, _ in self.distances.anchors(cell):
+            g[node] = min(offset, g.get(node, INF))
+        heap = [(d, node) for node, d in g.items()]
+        heapq.heapify(heap)
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d >= limit[0]:
+                break
+            if d > g[node]:
+                continue
+            for other in self._on_node.get(node, ()):
+                offer(other, d)
+            for direction, edge_id, other_node in graph.adjacency[node]:
+                edge = graph.edges[edge_id]
+                entries = self._on_edge.get(edge_id)
+                if entries:
+                    forward = node == edge.a and edge.moves[0] == direction
+                    if forward:
+                        scan(entries, (d + q + 1 for q, _ in entries))
+                    else:
+                        scan(entries[::-1], (d + edge.length - q - 1 for q, _ in entries[::-1]))
+                if d + edge.length < g.get(other_node, INF):
+                    g[other_node] = d + edge.length
+                    heapq.heappush(heap, (d + edge.length, other_node))
+        return sorted((d, other) for other, d in found.items())[:k]
+
+    def initial_tour(self, deadline: float = INF) -> List[int]:
+        """Vecino más cercano desde el inicio, mirando primero la lista de
+        vecinos (si ya está armada) y si no buscando en el grafo.
+
+        Si se pasa ``deadline``, los objetivos que falten se agregan en el
+        orden de ``walk_order``, que no busca nada.
+        """
+        visited = [False] * len(self.cells)
+        visited[0] = True
+        tour = [0]
+        for _ in range(len(self.cells) - 1):
+            if time.perf_counter() > deadline:
+                tour.extend(t for t in self.walk_order() if not visited[t])
+                break
+            current = tour[-1]
+            listed = self.neighbors[current] or ()
+            following = next((o for o in listed if not visited[o]), None)
+            if following is None:
+                found = self.nearest(current, 1, lambda o: not visited[o])
+                if not found:
+                    break
+                following = found[0][1]
+                self._cache[min(current, following), max(current, following)] = found[0][0]
+            visited[following] = True
+            tour.append(following)
+        return tour
+
+    def walk_order(self) -> List[int]:
+        """Objetivos (sin el inicio) en el orden en que los encuentra un
+        recorrido en profundidad del grafo desde el inicio, en tiempo lineal."""
+        graph = self.graph
+        order: List[int] = []
+        seen_nodes, seen_edges = set(), set()
+        stack = [node for node, _, _ in self.distances.anchors(self.cells[0])]
+        while stack:
+            node = stack.pop()
+            if node in seen_nodes:
+                continue
+            seen_nodes.add(node)
+            order.extend(self._on_node.get(node, ()))
+            for direction, edge_id, other in graph.adjacency[node]:
+                if edge_id in seen_edges:
+                    continue
+                seen_edges.add(edge_id)
+                entries = self._on_edge.get(edge_id, [])
+                edge = graph.edges[edge_id]
+                if not (node == edge.a and edge.moves[0] == direction):
+                    entries = entries[::-1]
+                order.extend(target for _, target in entries)
+                stack.append(other)
+        return [target for target in order if target != 0]
+
+    def _two_opt(self, tour: List[int], deadline: float) -> int:
+        # Cambia las aristas (a, b) y (c, e) por (a, c) y (b, e) invirtiendo
+        # el tramo entre ellas; c sale de la lista de vecinos de a
+        dist = self.distance
+        pos = _positions(tour)
+        n = len(tour)
+        gained = 0
+        for i in range(n - 1):
+            if time.perf_counter() > deadline:
+                break
+            a, b = tour[i], tour[i + 1]
+            d_ab = dist(a, b)
+            for c in self.neighbors[a] or ():
+                d_ac = dist(a, c)
+                if d_ac >= d_ab:
+                    break
+                j = pos[c]
+                if j > i + 1:
+                    gain = d_ab - d_ac
+                    if j + 1 < n:
+                        e = tour[j + 1]
+                        gain += dist(c, e) - dist(b, e)
+                    lo, hi = i + 1, j
+                elif j < i - 1:
+                    e = tour[j + 1]
+                    gain = d_ab + dist(c, e) - d_ac - dist(e, b)
+                    lo, hi = j + 1, i
+                else:
+                    continue
+                if gain > 0:
+                    tour[lo : hi + 1] = tour[lo : hi + 1][::-1]
+                    for k in range(lo, hi + 1):
+                        pos[tour[k]] = k
+                    gained += gain
+                    break
+        return gained
+
+    def _or_opt(self, tour: List[int], deadline: float) -> int:
+        # Mueve tramos cortos (en cualquier sentido) al lado de un vecino
+        # de uno de sus extremos
+        dist = self.distance
+        gained = 0
+        for size in OR_OPT_SEGMENTS:
+            pos = _positions(tour)
+            i = 1
+            while i + size <= len(tour):
+                if time.perf_counter() > deadline:
+                    return gained
+                n = len(tour)
+                first, last = tour[i], tour[i + size - 1]
+                prev = tour[i - 1]
+                removed = dist(prev, first)
+                if i + size < n:
+                    after = tour[i + size]
+                    removed += dist(last, after) - dist(prev, after)
+                best_gain, best = 0, None
+                for end, other in ((first, last), (last, first)):
+                    for c in self.neighbors[end] or ():
+                        d_ce = dist(c, end)
+                        if d_ce >= removed:
+                            break
+                        j = pos[c]
+                        if i - 1 <= j < i + size:
+                            continue
+                        added = d_ce
+                        if j + 1 < n:
+                            e = tour[j + 1]
+                            added += dist(other, e) - dist(c, e)
+                        if removed - added > best_gain:
+                            best_gain, best = removed - added, (c, end == last)
+                if best is None:
+                    i += 1
+                    continue
+                c, reverse = best
+                segment = tour[i : i + size]
+                del tour[i : i + size]
+                at = tour.index(c) + 1
+                tour[at:at] = segment[::-1] if reverse else segment
+                pos = _positions(tour)
+                gained += best_gain
+        return gained
+
+    def solve(self, budget: float = TOUR_BUDGET, begin: Optional[float] = None) -> TourPlan:
+        """Vecino más cercano y luego pasadas de 2-opt y Or-opt hasta un
+        óptimo local o hasta agotar ``budget`` segundos.
+
+        El presupuesto y los tiempos de ``history`` cuentan desde ``begin``
+        (``time.perf_counter``; por defecto, ahora) e incluyen armar el
+        recorrido inicial y las listas de vecinos. Si el recorrido inicial
+        se corta por tiempo, ordenar el resto con ``walk_order`` y medir su
+        largo va por fuera del presupuesto: casi todos sus tramos salen sin
+        buscar (``JunctionDistances.distance``), pero cada salto hacia atrás
+        del orden pide un A*. En mapas de 300x300 son ~0.3 s de más en un
+        laberinto (46k pellets) y ~1 s en uno abierto con 17% de paredes
+        (74k pellets).
+        """
+        begin = time.perf_counter() if begin is None else begin
+        deadline = begin + budget
+        tour = self.initial_tour(deadline)
+        length = self.length(tour)
+        history = [(time.perf_counter() - begin, length)]
+        self.build_neighbors(deadline)
+        while time.perf_counter() < deadline:
+            # Cada pasada devuelve cuánto acortó: el largo no se vuelve a sumar
+            gain = self._two_opt(tour, deadline) + self._or_opt(tour, deadline)
+            if not gain:
+                break
+            history.append((time.perf_counter() - begin, history[-1][1] - gain))
+        return TourPlan([self.cells[t] for t in tour[1:]], history[-1][1], history)
+
+
+def _positions(tour: Sequence[int]) -> List[int]:
+    pos = [0] * len(tour)
+    for k, node in enumerate(tour):
+        pos[node] = k
+    return pos
+
+
+def pending_targets(state: GameState) -> List[Cell]:
+    """Celdas con pellet o power pellet que quedan en ``state``."""
+    cols = state.level.cols
+    return [
+        (index % cols, index // cols) for index, item in enumerate(state.items) if item != EMPTY
+    ]
+
+
+def plan_tour(
+    state: GameState,
+    budget: float = TOUR_BUDGET,
+    graph: Optional[JunctionGraph] = None,
+) -> TourPlan:
+    """Orden de los pellets que quedan en ``state`` desde la celda de Pac-Man.
+
+    Con pocos objetivos (``EXACT_TOUR_TARGETS``) es el óptimo de Held-Karp;
+    si no, el de ``TourOptimizer``. ``budget`` cuenta desde que se llama:
+    incluye armar el grafo (si no se pasa), el recorrido inicial y las
+    listas de vecinos, y los tiempos de ``history`` se miden desde ahí (lo
+    que se puede pasar está en ``TourOptimizer.solve``).
+    """
+    begin = time.perf_counter()
+    graph = graph if graph is not None else JunctionGraph(state.level)
+    row, col = divmod(state.pacman.cell, state.level.cols)
+    optimizer = TourOptimizer(graph, (col, row), pending_targets(state))
+    if len(optimizer.cells) - 1 > EXACT_TOUR_TARGETS:
+        return optimizer.solve(budget, begin)
+    n = len(optimizer.cells)
+    dist = np.array([[optimizer.distance(i, j) for j in range(n)] for i in range(n)])
+    length, order = held_karp(dist)
+    return TourPlan(
+        [optimizer.cells[i] for i in order[1:]], length, [(time.perf_counter() - begin, length)]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recorrido de pellets: heurística vs. óptimo")
+    parser.add_argument("--map", help="archivo de mapa (por defecto RAW_MAP)")
+    parser.add_argument("--targets", type=int, default=16, help="pellets al azar; 0 = todos")
+    parser.add_argument("--budget", type=float, default=TOUR_BUDGET, help="segundos de mejora")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    level = load_level(args.map) if args.map else Level()
+    rng = np.random.default_rng(args.seed)
+    pellets = level.pellet_cells + level.power_cells
+    if 0 < args.targets < len(pellets):
+        pellets = [pellets[i] for i in rng.choice(len(pellets), size=args.targets, replace=False)]
+
+    optimizer = TourOptimizer(JunctionGraph(level), level.start, pellets)
+    print(f"Objetivos: {len(optimizer.cells) - 1}")
+    plan = optimizer.solve(args.budget)
+    print("Vecino más cercano y luego 2-opt / Or-opt (tiempos con listas de vecinos):")
+    for seconds, length in plan.history:
+        print(f"  {seconds:8.3f} s  {length} movimientos")
+
+    n = len(optimizer.cells)
+    if n - 1 <= 20:  # más allá Held-Karp tarda demasiado
+        dist = np.array([[optimizer.distance(i, j) for j in range(n)] for i in range(n)])
+        start = time.perf_counter()
+        length, order = held_karp(dist)
+        elapsed = time.perf_counter() - start
+        print(f"Óptimo (Held-Karp): {length} movimientos en {elapsed:.2f} s")
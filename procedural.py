@@ -6,11 +6,22 @@ https://gamedevelopment.tutsplus.com/tutorials/generate-random-cave-levels-using
 
 If Python and Arcade are installed, this example can be run from the command line with:
 python -m arcade.examples.procedural_caves_cellular
+
+The game only uses ChunkedCave, which steps each chunk with the NumPy
+``simulation_step``. ``PackedGrid`` and ``generate_cave`` are offline tools
+for building large fixed caves in one piece (e.g. 10,000 x 10,000 cells);
+the game view never calls them.
 """
 
+import itertools
+import os
 import random
 import arcade
+import numpy as np
 import timeit
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 # Sprite scaling. Make this larger, like 0.5 to zoom in and add
 # 'mystery' to what you can see. Make it smaller, like 0.1 to see
@@ -18,16 +29,17 @@ import timeit
 SPRITE_SCALING = 0.25
 SPRITE_SIZE = 128 * SPRITE_SCALING
 
-# How big the grid is
-GRID_WIDTH = 450
-GRID_HEIGHT = 400
-
 # Parameters for cellular automata
 CHANCE_TO_START_ALIVE = 0.4
 DEATH_LIMIT = 3
 BIRTH_LIMIT = 4
 NUMBER_OF_STEPS = 4
 
+# Infinite world: chunks of CHUNK_SIZE x CHUNK_SIZE cells generated on demand
+CHUNK_SIZE = 64
+MAX_CHUNKS = 1024  # LRU cap on cached chunks (4 KB each)
+CHUNK_LOAD_RADIUS = 1  # chunks around the player's chunk checked for collisions
+
 # How fast the player moves
 MOVEMENT_SPEED = 5
 
@@ -82,25 +94,322 @@ def count_alive_neighbors(grid, x, y):
     return alive_count
 
 
+def simulation_step(cells):
+    """Run a step of the cellular automaton on a 2D uint8 array (1 = alive).
+
+    The grid is padded with a ring of alive cells (edges count as alive)
+    and the eight neighbor counts are the sum of eight shifted views of it.
+    """
+    height, width = cells.shape
+    padded = np.pad(cells, 1, constant_values=1)
+    alive_neighbors = np.zeros(cells.shape, dtype=np.uint8)
+    for dy in range(3):
+        for dx in range(3):
+            if dy != 1 or dx != 1:
+                alive_neighbors += padded[dy : dy + height, dx : dx + width]
+    survives = (cells == 1) & (alive_neighbors >= DEATH_LIMIT)
+    born = (cells == 0) & (alive_neighbors > BIRTH_LIMIT)
+    return (survives | born).astype(np.uint8)
+
+
 def do_simulation_step(old_grid):
-    """Run a step of the cellular automaton."""
-    height = len(old_grid)
-    width = len(old_grid[0])
-    new_grid = create_grid(width, height)
-    for x in range(width):
-        for y in range(height):
-            alive_neighbors = count_alive_neighbors(old_grid, x, y)
-            if old_grid[y][x] == 1:
-                if alive_neighbors < DEATH_LIMIT:
-                    new_grid[y][x] = 0
-                else:
-                    new_grid[y][x] = 1
-            else:
-                if alive_neighbors > BIRTH_LIMIT:
-                    new_grid[y][x] = 1
-                else:
-                    new_grid[y][x] = 0
-    return new_grid
+    """Run a step of the cellular automaton on a list-of-lists grid."""
+    return simulation_step(np.array(old_grid, dtype=np.uint8)).tolist()
+
+
+WORD_BITS = 64
+ALL_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+PACK_ROWS = 1024  # rows generated per block when creating a packed grid
+MIN_BAND_ROWS = 2048  # fewer rows per worker cost more in process start-up than they save
+
+
+class PackedGrid:
+    """Cave grid with each row packed into 64-bit words (1 bit per cell).
+
+    Offline tool for large fixed caves: on a chunk-sized window the uint8
+    ``simulation_step`` is about twice as fast, so ``ChunkedCave`` uses that.
+
+    Cell ``x`` of a row is bit ``x % 64`` of word ``x // 64``; bits past
+    ``width`` in the last word are always 0. A 10,000 x 10,000 cave takes
+    12.5 MB instead of the hundreds of MB of a list-of-lists grid.
+    """
+
+    def __init__(self, width, height, words=None):
+        self.width = width
+        self.height = height
+        n_words = -(-width // WORD_BITS)
+        if words is None:
+            words = np.zeros((height, n_words), dtype=np.uint64)
+        self.words = words
+        # Valid bits of the last word of each row
+        self.tail_mask = np.full(n_words, ALL_ONES, dtype=np.uint64)
+        if width % WORD_BITS:
+            self.tail_mask[-1] = np.uint64((1 << (width % WORD_BITS)) - 1)
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Pack a 2D array (or list-of-lists grid) of 0/1 cells."""
+        cells = np.asarray(cells, dtype=np.uint8)
+        height, width = cells.shape
+        grid = cls(width, height)
+        n_bytes = grid.words.shape[1] * (WORD_BITS // 8)
+        packed = np.zeros((height, n_bytes), dtype=np.uint8)
+        packed[:, : -(-width // 8)] = np.packbits(cells, axis=1, bitorder="little")
+        grid.words = packed.view("<u8").astype(np.uint64)
+        return grid
+
+    @classmethod
+    def random(cls, width, height, chance=CHANCE_TO_START_ALIVE, seed=None):
+        """Random grid like ``initialize_grid``.
+
+        Each row has its own generator seeded with ``(seed, row)``, so any
+        band of rows can be rebuilt on its own (see ``generate_cave``).
+        """
+        seed = _entropy(seed)
+        grid = cls(width, height)
+        for top in range(0, height, PACK_ROWS):
+            bottom = min(top + PACK_ROWS, height)
+            grid.words[top:bottom] = _random_rows(width, top, bottom, chance, seed)
+        return grid
+
+    def to_cells(self):
+        """Unpack into a 2D uint8 array."""
+        as_bytes = self.words.astype("<u8").view(np.uint8)
+        return np.unpackbits(as_bytes, axis=1, count=self.width, bitorder="little")
+
+    def is_alive(self, x, y):
+        return bool((int(self.words[y, x // WORD_BITS]) >> (x % WORD_BITS)) & 1)
+
+    def step(self):
+        """Run a step of the cellular automaton, 64 cells per operation.
+
+        Rows are processed in bands of ``PACK_ROWS`` so the temporary bit
+        planes stay small whatever the size of the grid.
+        """
+        new_words = np.empty_like(self.words)
+        for top in range(0, self.height, PACK_ROWS):
+            bottom = min(top + PACK_ROWS, self.height)
+            new_words[top:bottom] = self._step_rows(top, bottom)
+        return PackedGrid(self.width, self.height, new_words)
+
+    def _step_rows(self, top, bottom):
+        # Next generation of rows [top, bottom). The eight neighbor planes
+        # are added with a bit-sliced ripple adder into a 4-bit count per
+        # cell; rows and columns outside the grid count as alive.
+        rows = bottom - top
+        one = np.uint64(1)
+        top_bit = np.uint64(WORD_BITS - 1)
+        padded = np.full((rows + 2, self.words.shape[1]), ALL_ONES, dtype=np.uint64)
+        first, last = max(top - 1, 0), min(bottom + 1, self.height)
+        padded[first - top + 1 : last - top + 1] = self.words[first:last]
+        # west[x] = cell x - 1 and east[x] = cell x + 1, across word borders
+        west = padded << one
+        west[:, 1:] |= padded[:, :-1] >> top_bit
+        west[:, 0] |= one
+        east = padded >> one
+        east[:, :-1] |= padded[:, 1:] << top_bit
+        east[:, -1] |= one << np.uint64((self.width - 1) % WORD_BITS)
+
+        count = [np.zeros_like(padded[1:-1]) for _ in range(4)]  # bit planes, LSB first
+        for plane in (west, padded, east):
+            _add_bit(count, plane[:-2])
+            _add_bit(count, plane[2:])
+        _add_bit(count, west[1:-1])
+        _add_bit(count, east[1:-1])
+
+        alive = padded[1:-1]
+        survives = alive & _at_least(count, DEATH_LIMIT)
+        born = ~alive & _at_least(count, BIRTH_LIMIT + 1)
+        return (survives | born) & self.tail_mask
+
+
+def _entropy(seed):
+    return np.random.SeedSequence().entropy if seed is None else seed
+
+
+def _random_rows(width, top, bottom, chance, seed):
+    # Packed words of rows [top, bottom) of PackedGrid.random(..., seed)
+    cells = np.empty((bottom - top, width), dtype=bool)
+    for row in range(top, bottom):
+        cells[row - top] = np.random.default_rng([seed, row]).random(width) < chance
+    return PackedGrid.from_cells(cells).words
+
+
+def generate_cave(width, height, steps=NUMBER_OF_STEPS, seed=None, workers=None):
+    """Generate a cave split into bands of rows across processes.
+
+    The result is identical to ``PackedGrid.random(width, height,
+    seed=seed)`` followed by ``steps`` calls to ``step``. Each band also
+    simulates a halo of ``steps`` rows above and below it: the wrong "edge
+    is alive" border of the band moves one row per step, so it never
+    reaches the rows the band keeps. The grid lives in shared memory and
+    workers read and write it in place.
+
+    Each worker gets at least ``MIN_BAND_ROWS`` rows; a grid too small to
+    split runs serially in this process.
+    """
+    seed = _entropy(seed)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, -(-height // MIN_BAND_ROWS))
+    if workers <= 1:
+        grid = PackedGrid.random(width, height, seed=seed)
+        for step in range(steps):
+            grid = grid.step()
+        return grid
+    band = max(-(-height // workers), 1)
+    bands = [(top, min(top + band, height)) for top in range(0, height, band)]
+    shape = (height, -(-width // WORD_BITS))
+    size = max(int(np.prod(shape)) * 8, 1)
+    source = shared_memory.SharedMemory(create=True, size=size)
+    target = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = [(source.name, shape, width, top, bottom, seed) for top, bottom in bands]
+            list(pool.map(_init_band, jobs))
+            jobs = [
+                (source.name, target.name, shape, width, top, bottom, steps)
+                for top, bottom in bands
+            ]
+            list(pool.map(_step_band, jobs))
+        words = np.ndarray(shape, dtype=np.uint64, buffer=target.buf).copy()
+    finally:
+        for block in (source, target):
+            block.close()
+            block.unlink()
+    return PackedGrid(width, height, words)
+
+
+def _shared_words(name, shape):
+    # track=False (Python 3.13+, see requires-python) keeps the worker's
+    # resource tracker from unlinking the block that the parent still owns.
+    block = shared_memory.SharedMemory(name=name, track=False)
+    return block, np.ndarray(shape, dtype=np.uint64, buffer=block.buf)
+
+
+def _init_band(job):
+    name, shape, width, top, bottom, seed = job
+    block, words = _shared_words(name, shape)
+    words[top:bottom] = _random_rows(width, top, bottom, CHANCE_TO_START_ALIVE, seed)
+    del words
+    block.close()
+
+
+def _step_band(job):
+    source_name, target_name, shape, width, top, bottom, steps = job
+    source, words = _shared_words(source_name, shape)
+    first, last = max(top - steps, 0), min(bottom + steps, shape[0])
+    grid = PackedGrid(width, last - first, words[first:last].copy())
+    del words
+    source.close()
+    for step in range(steps):
+        grid = grid.step()
+    target, out = _shared_words(target_name, shape)
+    out[top:bottom] = grid.words[top - first : bottom - first]
+    del out
+    target.close()
+
+
+def _add_bit(count, plane):
+    # count += plane, one bit per cell, in place
+    carry = plane
+    for i, bits in enumerate(count):
+        count[i] = bits ^ carry
+        carry = bits & carry
+
+
+def _at_least(count, k):
+    # Mask of cells whose bit-sliced count is >= the constant k
+    if k <= 0:
+        return np.full_like(count[0], ALL_ONES)
+    if k >= 1 << len(count):
+        return np.zeros_like(count[0])
+    greater = np.zeros_like(count[0])
+    equal = np.full_like(count[0], ALL_ONES)
+    for i in reversed(range(len(count))):
+        if (k >> i) & 1:
+            equal &= count[i]
+        else:
+            greater |= equal & count[i]
+            equal &= ~count[i]
+    return greater | equal
+
+
+class ChunkedCave:
+    """Unbounded cave generated lazily in ``CHUNK_SIZE`` x ``CHUNK_SIZE`` chunks.
+
+    The starting noise of every cell depends only on the world seed and its
+    coordinates (one generator per chunk-sized block, seeded with the seed
+    and the block coordinates). A chunk is simulated together with a margin
+    of ``NUMBER_OF_STEPS`` cells, which is as far as the automaton can see
+    in that many steps, so neighboring chunks always agree at their seams.
+    The world has no edges. Generated chunks are kept in an LRU cache of at
+    most ``max_chunks`` entries; evicted chunks are rebuilt identically.
+    """
+
+    def __init__(self, seed=None, max_chunks=MAX_CHUNKS):
+        self.seed = _entropy(seed)
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()  # (chunk_x, chunk_y) -> uint8 (row, column)
+
+    def chunk(self, chunk_x, chunk_y):
+        """Cells of a chunk as a (CHUNK_SIZE, CHUNK_SIZE) uint8 array, row first."""
+        key = (chunk_x, chunk_y)
+        cells = self.chunks.get(key)
+        if cells is not None:
+            self.chunks.move_to_end(key)
+            return cells
+        cells = self._generate(chunk_x, chunk_y)
+        self.chunks[key] = cells
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return cells
+
+    def is_wall(self, x, y):
+        chunk_x, column = divmod(x, CHUNK_SIZE)
+        chunk_y, row = divmod(y, CHUNK_SIZE)
+        return bool(self.chunk(chunk_x, chunk_y)[row, column])
+
+    def open_cell_near(self, x, y):
+        """An open cell (x, y) close to the given one, searching rings of
+        chunks outward until one has open space."""
+        chunk_x, chunk_y = x // CHUNK_SIZE, y // CHUNK_SIZE
+        for ring in itertools.count():
+            found = []
+            for dy in range(-ring, ring + 1):
+                for dx in range(-ring, ring + 1):
+                    if max(abs(dx), abs(dy)) != ring:
+                        continue
+                    rows, columns = np.nonzero(self.chunk(chunk_x + dx, chunk_y + dy) == 0)
+                    columns += (chunk_x + dx) * CHUNK_SIZE
+                    rows += (chunk_y + dy) * CHUNK_SIZE
+                    found.append(np.stack([columns, rows], axis=1))
+            cells = np.concatenate(found)
+            if len(cells):
+                closest = np.abs(cells - (x, y)).sum(axis=1).argmin()
+                return int(cells[closest, 0]), int(cells[closest, 1])
+
+    def _noise(self, block_x, block_y):
+        rng = np.random.default_rng([self.seed, _natural(block_x), _natural(block_y)])
+        return (rng.random((CHUNK_SIZE, CHUNK_SIZE)) < CHANCE_TO_START_ALIVE).astype(np.uint8)
+
+    def _generate(self, chunk_x, chunk_y):
+        margin = NUMBER_OF_STEPS
+        noise = np.block(
+            [
+                [self._noise(chunk_x + dx, chunk_y + dy) for dx in (-1, 0, 1)]
+                for dy in (-1, 0, 1)
+            ]
+        )
+        window = slice(CHUNK_SIZE - margin, 2 * CHUNK_SIZE + margin)
+        cells = noise[window, window]
+        for step in range(NUMBER_OF_STEPS):
+            cells = simulation_step(cells)
+        return cells[margin:-margin, margin:-margin] if margin else cells
+
+
+def _natural(n):
+    # Map any integer to a distinct non-negative one (seed entropy must be >= 0)
+    return 2 * n if n >= 0 else -2 * n - 1
 
 
 class InstructionView(arcade.View):
@@ -149,8 +458,11 @@ class GameView(arcade.View):
     def __init__(self):
         super().__init__()
 
-        self.grid = None
-        self.wall_list = None
+        self.world = None
+        self.wall_texture = None
+        self.chunk_lists = None  # (chunk_x, chunk_y) -> SpriteList of its walls
+        self.visible_chunks = set()
+        self.player_chunks = set()
         self.player_list = None
         self.player_sprite = None
         self.draw_time = 0
@@ -175,25 +487,12 @@ class GameView(arcade.View):
         self.window.background_color = arcade.color.BLACK
 
     def setup(self):
-        self.wall_list = arcade.SpriteList(use_spatial_hash=True)
         self.player_list = arcade.SpriteList()
 
-        # Create cave system using a 2D grid
-        self.grid = create_grid(GRID_WIDTH, GRID_HEIGHT)
-        initialize_grid(self.grid)
-        for step in range(NUMBER_OF_STEPS):
-            self.grid = do_simulation_step(self.grid)
-
-        texture = arcade.load_texture(":resources:images/tiles/grassCenter.png")
-        # Create sprites based on 2D grid
-        # Each grid location is a sprite.
-        for row in range(GRID_HEIGHT):
-            for column in range(GRID_WIDTH):
-                if self.grid[row][column] == 1:
-                    wall = arcade.BasicSprite(texture, scale=SPRITE_SCALING)
-                    wall.center_x = column * SPRITE_SIZE + SPRITE_SIZE / 2
-                    wall.center_y = row * SPRITE_SIZE + SPRITE_SIZE / 2
-                    self.wall_list.append(wall)
+        # Unbounded cave, generated chunk by chunk as the player gets close
+        self.world = ChunkedCave()
+        self.wall_texture = arcade.load_texture(":resources:images/tiles/grassCenter.png")
+        self.chunk_lists = {}
 
         # Set up the player
         self.player_sprite = arcade.Sprite(
@@ -202,28 +501,14 @@ class GameView(arcade.View):
         )
         self.player_list.append(self.player_sprite)
 
-        # Randomly place the player. If we are in a wall, repeat until we aren't.
-        placed = False
-        while not placed:
-            # Randomly position
-            max_x = int(GRID_WIDTH * SPRITE_SIZE)
-            max_y = int(GRID_HEIGHT * SPRITE_SIZE)
-            self.player_sprite.center_x = random.randrange(max_x)
-            self.player_sprite.center_y = random.randrange(max_y)
-
-            # Are we in a wall?
-            walls_hit = arcade.check_for_collision_with_list(
-                self.player_sprite, self.wall_list
-            )
-            if len(walls_hit) == 0:
-                # Not in a wall! Success!
-                placed = True
+        # Place the player on an open cell near the origin
+        column, row = self.world.open_cell_near(0, 0)
+        self.player_sprite.center_x = column * SPRITE_SIZE + SPRITE_SIZE / 2
+        self.player_sprite.center_y = row * SPRITE_SIZE + SPRITE_SIZE / 2
 
         # Draw info on the screen
-        sprite_count = len(self.wall_list)
-        output = f"Sprite Count: {sprite_count:,}"
         self.sprite_count_text = arcade.Text(
-            output, 20, self.window.height - 20, arcade.color.WHITE, 16
+            "Sprite Count:", 20, self.window.height - 20, arcade.color.WHITE, 16
         )
 
         output = "Drawing time:"
@@ -236,11 +521,69 @@ class GameView(arcade.View):
             output, 20, self.window.height - 60, arcade.color.WHITE, 16
         )
 
-        self.physics_engine = arcade.PhysicsEngineSimple(
-            self.player_sprite, self.wall_list
-        )
-
         self.scroll_to_player(1.0)
+        self.stream_chunks()
+
+    def chunks_in(self, left, bottom, right, top):
+        """Keys of the chunks that overlap a rectangle in world pixels."""
+        size = CHUNK_SIZE * SPRITE_SIZE
+        return {
+            (chunk_x, chunk_y)
+            for chunk_x in range(int(left // size), int(right // size) + 1)
+            for chunk_y in range(int(bottom // size), int(top // size) + 1)
+        }
+
+    def stream_chunks(self):
+        """Build the SpriteLists of the chunks in view of ``camera_sprites``
+        and around the player, and release the ones that are far from both.
+
+        Only visible chunks are drawn, and the player only collides with the
+        chunks around it, so draw time and GPU memory depend on the screen
+        size and not on how much of the world has been explored.
+        """
+        size = CHUNK_SIZE * SPRITE_SIZE
+        camera_x, camera_y = self.camera_sprites.position
+        half_width = self.window.width / 2 / self.camera_sprites.zoom
+        half_height = self.window.height / 2 / self.camera_sprites.zoom
+        left, bottom = camera_x - half_width, camera_y - half_height
+        right, top = camera_x + half_width, camera_y + half_height
+        player_x = int(self.player_sprite.center_x // size)
+        player_y = int(self.player_sprite.center_y // size)
+        radius = range(-CHUNK_LOAD_RADIUS, CHUNK_LOAD_RADIUS + 1)
+        player_chunks = {(player_x + dx, player_y + dy) for dx in radius for dy in radius}
+        self.visible_chunks = self.chunks_in(left, bottom, right, top)
+
+        # Keep one extra ring alive so moving along a border doesn't thrash
+        keep = self.chunks_in(left - size, bottom - size, right + size, top + size)
+        ring = range(-CHUNK_LOAD_RADIUS - 1, CHUNK_LOAD_RADIUS + 2)
+        keep |= {(player_x + dx, player_y + dy) for dx in ring for dy in ring}
+        for key in list(self.chunk_lists):
+            if key not in keep:
+                del self.chunk_lists[key]
+        for key in self.visible_chunks | player_chunks:
+            if key not in self.chunk_lists:
+                self.chunk_lists[key] = self.create_chunk_walls(*key)
+
+        if player_chunks != self.player_chunks:
+            self.player_chunks = player_chunks
+            self.physics_engine = arcade.PhysicsEngineSimple(
+                self.player_sprite, [self.chunk_lists[key] for key in player_chunks]
+            )
+
+        drawn = sum(len(self.chunk_lists[key]) for key in self.visible_chunks)
+        alive = sum(len(walls) for walls in self.chunk_lists.values())
+        self.sprite_count_text.text = f"Sprite Count: {drawn:,} drawn / {alive:,} alive"
+
+    def create_chunk_walls(self, chunk_x, chunk_y):
+        """SpriteList with one wall sprite per wall cell of a chunk."""
+        cells = self.world.chunk(chunk_x, chunk_y)
+        walls = arcade.SpriteList(use_spatial_hash=True)
+        for row, column in np.argwhere(cells == 1).tolist():
+            wall = arcade.BasicSprite(self.wall_texture, scale=SPRITE_SCALING)
+            wall.center_x = (chunk_x * CHUNK_SIZE + column) * SPRITE_SIZE + SPRITE_SIZE / 2
+            wall.center_y = (chunk_y * CHUNK_SIZE + row) * SPRITE_SIZE + SPRITE_SIZE / 2
+            walls.append(wall)
+        return walls
 
     def on_draw(self):
         """Render the screen."""
@@ -256,7 +599,8 @@ class GameView(arcade.View):
         self.camera_sprites.use()
 
         # Draw the sprites
-        self.wall_list.draw(pixelated=True)
+        for key in self.visible_chunks:
+            self.chunk_lists[key].draw(pixelated=True)
         self.player_list.draw()
 
         # Select the (unscrolled) camera for our GUI
@@ -348,6 +692,7 @@ class GameView(arcade.View):
 
         # Scroll the screen to the player
         self.scroll_to_player(camera_speed=CAMERA_SPEED)
+        self.stream_chunks()
 
         # Save the time it took to do this.
         self.processing_time = timeit.default_timer() - start_time
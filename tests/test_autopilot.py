@@ -0,0 +1,43 @@
+from pacman_autopilot import Autopilot
+from pacman_core import DIRECTIONS, GameState, Level
+
+
+def play(state, pilot):
+    state.pacman.steer = pilot.steer
+    while state.state == "PLAY":
+        state.advance()
+    return state
+
+
+def test_autopilot_clears_level():
+    state = GameState(Level(), n_ghosts=0)
+    pilot = Autopilot(state, budget=0)
+    # armar el piloto no expande la ruta
+    assert pilot.route == [pilot.route[0]] and not pilot.legs
+    assert play(state, pilot).state == "WIN"
+
+
+def test_restart_reuses_order_and_legs():
+    level = Level()
+    first = GameState(level, n_ghosts=0)
+    pilot = Autopilot(first, budget=0)
+    play(first, pilot)
+    legs = dict(pilot.legs)
+    second = GameState(level, n_ghosts=0)
+    pilot.restart(second)
+    pilot.distances = None  # una búsqueda nueva fallaría
+    assert play(second, pilot).state == "WIN"
+    assert second.tick == first.tick
+    assert pilot.legs == legs
+
+
+def test_restart_replans_pilot_built_mid_game():
+    level = Level()
+    state = GameState(level, n_ghosts=0)
+    for _ in range(200):
+        state.step(DIRECTIONS[0])
+    pilot = Autopilot(state, budget=0)
+    assert pilot.origin[1] != bytes(GameState(level).items)
+    fresh = GameState(level, n_ghosts=0)
+    pilot.restart(fresh)
+    assert play(fresh, pilot).state == "WIN"
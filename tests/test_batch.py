@@ -0,0 +1,55 @@
+import numpy as np
+
+from pacman_batch import LOSE, PLAY, BatchEnv
+from pacman_core import NO_MOVE, STOP, Level
+
+
+def test_stop_keeps_pacman_in_place():
+    env = BatchEnv(Level(), n_envs=2, seed=0)
+    start = env.pacman.copy()
+    env.step(np.array([0, 0]))
+    moved = env.pacman.copy()
+    assert (moved != start).all()
+    env.step(np.array([STOP, STOP]))
+    assert (env.pacman == moved).all()
+    env.step(np.array([-1, -1]))  # mantener la deseada: sigue quieto
+    assert (env.pacman == moved).all()
+
+
+def test_rollout_bookkeeping():
+    env = BatchEnv(Level(), n_envs=64, seed=1)
+    rng = np.random.default_rng(1)
+    total = np.zeros(env.n_envs, dtype=np.int64)
+    for _ in range(400):
+        was_done = env.done.copy()
+        frozen = env.pacman.copy()
+        rewards, done = env.step(rng.integers(-1, STOP + 1, env.n_envs))
+        total += rewards
+        assert (rewards[was_done] == 0).all()
+        assert (env.pacman[was_done] == frozen[was_done]).all()
+        assert (env.remaining == env.pellets.sum(axis=1) + env.powers.sum(axis=1)).all()
+    assert (total == env.score).all()
+    assert (env.lives[env.state == LOSE] == 0).all()
+
+    env.reset(env.done)
+    assert (env.state == PLAY).all()
+
+
+def test_ghosts_chase_along_the_flow_field():
+    level = Level()
+    env = BatchEnv(level, n_envs=8, seed=2)
+    rng = np.random.default_rng(2)
+    for _ in range(60):
+        before = env.ghosts.copy()
+        frightened = env.frightened.copy()
+        dead = env.dead.copy()
+        lives = env.lives.copy()
+        env.step(rng.integers(0, STOP, env.n_envs))
+        moved = env.ghosts != before
+        # al perder una vida vuelven todos al spawn
+        alive = (env.state == PLAY) & (env.lives == lives)
+        chasing = ~(frightened | env.frightened | dead)  # comer un power pellet asusta en el mismo paso
+        for e, g in zip(*np.nonzero(moved & alive[:, None] & chasing)):
+            hop = level.flow_field(int(env.pacman[e])).next_move[before[e, g]]
+            if hop != NO_MOVE and env.legal[before[e, g], hop]:
+                assert env.ghosts[e, g] == env.neighbors[before[e, g], hop]
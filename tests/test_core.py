@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from pacman_autopilot import Autopilot
+from pacman_core import DIRECTIONS, STOP_DIR, GameState, Level
+
+
+def snapshot(state):
+    ghosts = state.ghosts
+    pacman = state.pacman
+    return (
+        state.tick,
+        state.state,
+        pacman.cell,
+        pacman.offset_x,
+        pacman.offset_y,
+        pacman.score,
+        pacman.lives,
+        pacman.power_timer,
+        ghosts.cell.tolist(),
+        ghosts.offset.tolist(),
+        ghosts.direction.tolist(),
+        ghosts.desired.tolist(),
+        ghosts.mode.tolist(),
+        bytes(state.items),
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("n_ghosts", [0, 4, 16])
+@pytest.mark.parametrize("until_center", [False, True])
+def test_advance_matches_step(seed, n_ghosts, until_center):
+    # Mismas acciones al azar: advance debe dejar el estado igual que step
+    level = Level()
+    jumped = GameState(level, seed=seed, n_ghosts=n_ghosts)
+    stepped = GameState(level, seed=seed, n_ghosts=n_ghosts)
+    rng = random.Random(seed)
+    while jumped.state == "PLAY" and jumped.tick < 3000:
+        action = rng.choice(DIRECTIONS) if rng.random() < 0.3 else None
+        ticks = jumped.advance(action, rng.choice([1, 5, 50, 1 << 20]), until_center)
+        stepped.step(action)
+        for _ in range(ticks - 1):
+            stepped.step()
+        assert snapshot(jumped) == snapshot(stepped)
+
+
+def test_advance_matches_step_with_autopilot():
+    level = Level()
+    states = [GameState(level, seed=1, n_ghosts=4) for _ in range(2)]
+    for state in states:
+        state.pacman.steer = Autopilot(state, budget=0).steer
+    jumped, stepped = states
+    while jumped.state == "PLAY":
+        jumped.advance()
+        while stepped.tick < jumped.tick:
+            stepped.step()
+        assert snapshot(jumped) == snapshot(stepped)
+
+
+def test_advance_until_center_stops_at_every_center():
+    # Ningún tick intermedio del salto deja a Pac-Man en movimiento sobre un centro
+    level = Level()
+    jumped = GameState(level, seed=0, n_ghosts=4)
+    stepped = GameState(level, seed=0, n_ghosts=4)
+    rng = random.Random(0)
+    while jumped.state == "PLAY" and jumped.tick < 3000:
+        action = rng.choice(DIRECTIONS) if rng.random() < 0.3 else None
+        ticks = jumped.advance(action, until_center=True)
+        stepped.step(action)
+        for _ in range(ticks - 1):
+            pacman = stepped.pacman
+            assert not (pacman.at_center and pacman.current_dir != STOP_DIR)
+            stepped.step()
+        assert snapshot(jumped) == snapshot(stepped)
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from pacman_core import EMPTY, MASK_DIRECTIONS, GameState, Level
+from pacman_graph import JunctionGraph, follow_corridor
+
+
+def random_level(rng, cols, rows, walls):
+    return Level(
+        ["".join("#" if rng.random() < walls else "." for _ in range(cols)) for _ in range(rows)]
+    )
+
+
+RING = ["#####", "#...#", "#.#.#", "#...#", "#####"]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_graph_covers_every_free_cell(seed):
+    rng = random.Random(seed)
+    level = [Level(), Level(RING), random_level(rng, 20, 12, 0.3), random_level(rng, 9, 9, 0.5)][seed]
+    graph = JunctionGraph(level)
+    free = {(i % level.cols, i // level.cols) for i, wall in enumerate(level.walls) if not wall}
+    interior = [cell for corridor in graph.edges for cell in corridor.cells]
+    # cada celda libre es un nodo o está en el interior de un solo pasillo
+    assert len(interior) == len(set(interior)) == len(graph.corridor_of)
+    assert set(graph.nodes) | set(interior) == free
+    assert not set(graph.nodes) & set(interior)
+    for edge_id, corridor in enumerate(graph.edges):
+        assert corridor.length == len(corridor.cells) + 1
+        cell = graph.nodes[corridor.a]
+        for (dx, dy), expected in zip(corridor.moves, corridor.cells + (graph.nodes[corridor.b],)):
+            cell = (cell[0] + dx, cell[1] - dy)
+            assert cell == expected
+        for position, cell in enumerate(corridor.cells):
+            assert graph.corridor_of[cell] == (edge_id, position)
+        assert corridor.pellets == tuple(
+            (c, r) for c, r in corridor.cells if level.items[r * level.cols + c] != EMPTY
+        )
+    for node, (col, row) in enumerate(graph.nodes):
+        directions = [d for d, _, _ in graph.exits(node)]
+        assert sorted(directions) == sorted(MASK_DIRECTIONS[level.move_masks[row * level.cols + col]])
+
+
+def test_follow_corridor_eats_its_pellets():
+    level = Level()
+    graph = JunctionGraph(level, extra_nodes=[level.start])
+    state = GameState(level, seed=0, n_ghosts=0)
+    node = graph.node_index[level.start]
+    for direction, edge_id, other in graph.exits(node):
+        before = graph.remaining_pellets(edge_id, state)
+        score = state.pacman.score
+        ticks = follow_corridor(state, graph, node, direction)
+        assert ticks > 0 and graph.remaining_pellets(edge_id, state) == 0
+        assert state.pacman.score > score or before == 0
+        # y de vuelta al nodo de salida
+        back = next(d for d, e, o in graph.exits(other) if e == edge_id and o == node)
+        follow_corridor(state, graph, other, back)
+        row, col = divmod(state.pacman.cell, level.cols)
+        assert (col, row) == level.start
+
+
+def test_follow_corridor_walks_corridors_twice():
+    # Ida y vuelta por los mismos pasillos: a la vuelta ya no tienen pellets
+    level = Level()
+    graph = JunctionGraph(level, extra_nodes=[level.start])
+    state = GameState(level, seed=0, n_ghosts=0)
+    rng = random.Random(0)
+    node = graph.node_index[level.start]
+    there = []
+    for _ in range(100):
+        direction, edge_id, other = rng.choice(graph.exits(node))
+        there.append((node, direction, edge_id))
+        node = other
+    back = []
+    for start, direction, edge_id in reversed(there):
+        moves, _ = graph.edges[edge_id].walk(start, direction)
+        back.append((-moves[-1][0], -moves[-1][1]))
+
+    node = graph.node_index[level.start]
+    for direction in [d for _, d, _ in there] + back:
+        target = next(o for d, _, o in graph.exits(node) if d == direction)
+        follow_corridor(state, graph, node, direction)
+        assert state.state == "PLAY"
+        assert state.pacman.at_center
+        row, col = divmod(state.pacman.cell, level.cols)
+        assert (col, row) == graph.nodes[target]
+        node = target
+    assert node == graph.node_index[level.start]
@@ -0,0 +1,73 @@
+import pickle
+
+from pacman_core import RAW_MAP, GameState, Level
+from pacman_maps import compiled_path, load_level
+
+
+def tables(level):
+    return (
+        level.rows,
+        level.cols,
+        level.start,
+        level.ghost_spawns,
+        level.pellet_cells,
+        level.power_cells,
+        level.item_count,
+        bytes(level.walls),
+        bytes(level.items),
+        bytes(level.move_masks),
+        list(level.neighbors),
+        level.walls_grid,
+    )
+
+
+def write_map(tmp_path, rows):
+    path = tmp_path / "map"
+    path.write_text("\n".join(rows) + "\n")
+    return path
+
+
+def test_compiled_level_matches_parsed(tmp_path):
+    path = write_map(tmp_path, RAW_MAP)
+    first = load_level(path)
+    assert compiled_path(path).exists()
+    cached = load_level(path)
+    # la segunda carga viene del mmap y arma las celdas al pedirlas
+    assert isinstance(cached.walls, memoryview) and cached._pellet_cells is None
+    assert tables(cached) == tables(first) == tables(Level(RAW_MAP))
+    assert tables(pickle.loads(pickle.dumps(cached))) == tables(first)
+    state = GameState(cached, seed=0)
+    assert state.items == Level(RAW_MAP).items
+
+
+def test_cache_invalidated_when_map_changes(tmp_path):
+    path = write_map(tmp_path, RAW_MAP)
+    load_level(path)
+    changed = list(RAW_MAP)
+    changed[1] = changed[1].replace(".", " ", 1)
+    write_map(tmp_path, changed)
+    assert tables(load_level(path)) == tables(Level(changed))
+    assert tables(load_level(path)) == tables(Level(changed))
+
+
+def test_load_without_cache(tmp_path):
+    path = write_map(tmp_path, RAW_MAP)
+    level = load_level(path, use_cache=False)
+    assert not compiled_path(path).exists()
+    assert tables(level) == tables(Level(RAW_MAP))
+
+
+def test_quoted_rows(tmp_path):
+    path = tmp_path / "map"
+    path.write_text("\n".join(f'    "{row}",' for row in RAW_MAP))
+    assert load_level(path, use_cache=False).raw_map == Level(RAW_MAP).raw_map
+
+
+def test_broken_cache_is_rewritten(tmp_path):
+    path = write_map(tmp_path, RAW_MAP)
+    load_level(path)
+    cache = compiled_path(path)
+    for junk in (b"", b"PGC\x00", cache.read_bytes()[:-8]):
+        cache.write_bytes(junk)
+        assert tables(load_level(path)) == tables(Level(RAW_MAP))
+        assert isinstance(load_level(path).walls, memoryview)
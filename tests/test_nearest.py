@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+import pytest
+
+import pacman_nearest
+from pacman_core import Level, bfs_distances, neighbor_array
+from pacman_nearest import NearestPellets, greedy_route
+
+
+def random_level(rng, cols, rows, walls, pellets):
+    cells = [["#" if rng.random() < walls else " " for _ in range(cols)] for _ in range(rows)]
+    for row in cells:
+        for c in range(cols):
+            if row[c] == " " and rng.random() < pellets:
+                row[c] = "."
+    return Level(["".join(row) for row in cells])
+
+
+@pytest.mark.parametrize("far_frontier", [1, pacman_nearest.FAR_FRONTIER])
+@pytest.mark.parametrize("seed", range(6))
+def test_nearest_matches_bfs(monkeypatch, seed, far_frontier):
+    # far_frontier=1 pasa todas las búsquedas largas por el BFS de NumPy
+    monkeypatch.setattr(pacman_nearest, "FAR_FRONTIER", far_frontier)
+    rng = random.Random(seed)
+    level = random_level(rng, 30, 20, walls=0.25, pellets=0.3)
+    pellets = NearestPellets(level)
+    neighbors = neighbor_array(level)
+    free = [index for index, wall in enumerate(level.walls) if not wall]
+    for _ in range(200):
+        index = rng.choice(free)
+        pending = np.flatnonzero(np.frombuffer(pellets.pending, dtype=np.uint8))
+        expected = int(bfs_distances(neighbors, pending)[index]) if len(pending) else -1
+        path = pellets.nearest(index)
+        if expected < 0:
+            assert path == []
+            continue
+        assert len(path) - 1 == expected
+        assert path[0] == index and pellets.pending[path[-1]]
+        for a, b in zip(path, path[1:]):
+            assert b in pellets.neighbors[a]
+        if rng.random() < 0.5:
+            assert pellets.remove(path[-1])
+            assert not pellets.remove(path[-1])
+    assert pellets.remaining == sum(pellets.pending)
+
+
+def test_greedy_route_eats_every_reachable_pellet():
+    level = Level()
+    route = greedy_route(level)
+    assert route[0] == level.start
+    for (c0, r0), (c1, r1) in zip(route, route[1:]):
+        assert abs(c1 - c0) + abs(r1 - r0) == 1
+    assert set(level.pellet_cells + level.power_cells) <= set(route)
@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+import pytest
+
+from pacman_core import Level, bfs_distances, neighbor_array
+from pacman_paths import DistanceTable
+
+
+def random_level(rng, cols, rows, walls):
+    return Level(
+        ["".join("#" if rng.random() < walls else "." for _ in range(cols)) for _ in range(rows)]
+    )
+
+
+def free_cells(level):
+    return [(i % level.cols, i // level.cols) for i, wall in enumerate(level.walls) if not wall]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matrix_and_lru_agree_with_bfs(seed, tmp_path):
+    rng = random.Random(seed)
+    level = Level() if seed == 0 else random_level(rng, 25, 15, walls=0.3)
+    matrix = DistanceTable(level, cache_dir=tmp_path)
+    lru = DistanceTable(level, cache_dir=tmp_path, max_cells=0, cache_size=4)
+    assert matrix.dist is not None and lru.dist is None
+    cells = free_cells(level)
+    neighbors = neighbor_array(level)
+    for _ in range(15):
+        b = rng.choice(cells)
+        expected = bfs_distances(neighbors, [level.cell_index(*b)])
+        assert np.array_equal(matrix.field(b), expected)
+        assert np.array_equal(lru.field(b), expected)
+        for a in rng.sample(cells, 10):
+            d = int(expected[level.cell_index(*a)])
+            assert matrix.distance(a, b) == lru.distance(a, b) == d
+            for table in (matrix, lru):
+                path = table.path(a, b)
+                assert len(path) == d + 1 if d >= 0 else path == []
+                assert all(not level.walls[level.cell_index(*cell)] for cell in path)
+    assert len(lru._trees) <= 4
+
+
+def test_matrix_reopened_from_disk(tmp_path):
+    level = Level()
+    built = DistanceTable(level, cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+    loaded = DistanceTable(level, cache_dir=tmp_path)
+    assert isinstance(loaded.dist, np.memmap)
+    assert np.array_equal(loaded.dist, built.dist)
+    assert np.array_equal(loaded.next_move, built.next_move)
+
+
+def test_unwritable_cache_dir_keeps_table_in_memory(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    table = DistanceTable(Level(), cache_dir=blocker / "cache")
+    assert table.dist is not None and not isinstance(table.dist, np.memmap)
+    assert table.distance((1, 1), (1, 1)) == 0
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+import procedural
+from procedural import (
+    ChunkedCave,
+    PackedGrid,
+    count_alive_neighbors,
+    do_simulation_step,
+    generate_cave,
+    simulation_step,
+)
+
+
+def reference_step(grid):
+    # The original arcade example step, one cell at a time
+    new_grid = [row[:] for row in grid]
+    for y, row in enumerate(grid):
+        for x, cell in enumerate(row):
+            alive = count_alive_neighbors(grid, x, y)
+            if cell == 1:
+                new_grid[y][x] = 1 if alive >= procedural.DEATH_LIMIT else 0
+            else:
+                new_grid[y][x] = 1 if alive > procedural.BIRTH_LIMIT else 0
+    return new_grid
+
+
+@pytest.mark.parametrize("width, height", [(1, 1), (7, 5), (64, 3), (130, 40)])
+def test_steps_agree(width, height):
+    rng = np.random.default_rng(width * 1000 + height)
+    cells = (rng.random((height, width)) < procedural.CHANCE_TO_START_ALIVE).astype(np.uint8)
+    grid = cells.tolist()
+    for _ in range(procedural.NUMBER_OF_STEPS):
+        grid = reference_step(grid)
+        cells = simulation_step(cells)
+        assert cells.tolist() == grid
+        assert do_simulation_step(cells.tolist()) == simulation_step(cells).tolist()
+
+
+# Widths around the 64-bit word size, where the packed step carries bits
+# between neighboring words
+@pytest.mark.parametrize("width", [1, 63, 64, 65, 128, 130, 200])
+@pytest.mark.parametrize("height", [1, 2, 9])
+def test_packed_step_matches_numpy(width, height):
+    rng = np.random.default_rng(width * 100 + height)
+    cells = (rng.random((height, width)) < procedural.CHANCE_TO_START_ALIVE).astype(np.uint8)
+    packed = PackedGrid.from_cells(cells)
+    assert np.array_equal(packed.to_cells(), cells)
+    for _ in range(procedural.NUMBER_OF_STEPS):
+        cells = simulation_step(cells)
+        packed = packed.step()
+        assert np.array_equal(packed.to_cells(), cells)
+    # Padding bits past the width stay zero
+    assert np.array_equal(PackedGrid.from_cells(cells).words, packed.words)
+
+
+@pytest.mark.parametrize("workers", [2, 3, 5])
+def test_generate_cave_bands_match_single_band(monkeypatch, workers):
+    # Tiny bands so the halos cross several band boundaries
+    monkeypatch.setattr(procedural, "MIN_BAND_ROWS", 8)
+    single = PackedGrid.random(150, 45, seed=3)
+    for _ in range(procedural.NUMBER_OF_STEPS):
+        single = single.step()
+    banded = generate_cave(150, 45, seed=3, workers=workers)
+    assert np.array_equal(banded.words, single.words)
+    assert np.array_equal(generate_cave(150, 45, seed=3, workers=1).words, single.words)
+
+
+@pytest.mark.parametrize("width, height, steps", [(64, 7, 4), (65, 13, 6), (3, 20, 0), (200, 6, 3)])
+def test_generate_cave_bands_thinner_than_halo(monkeypatch, width, height, steps):
+    # Bands of a few rows: the halo of ``steps`` rows reaches past the neighbor band
+    monkeypatch.setattr(procedural, "MIN_BAND_ROWS", 2)
+    single = PackedGrid.random(width, height, seed=11)
+    for _ in range(steps):
+        single = single.step()
+    banded = generate_cave(width, height, steps=steps, seed=11, workers=4)
+    assert (banded.width, banded.height) == (width, height)
+    assert np.array_equal(banded.words, single.words)
+
+
+@pytest.mark.parametrize("seed", [0, 7])
+def test_chunks_agree_with_one_large_window(monkeypatch, seed):
+    monkeypatch.setattr(procedural, "CHUNK_SIZE", 16)
+    size = procedural.CHUNK_SIZE
+    cave = ChunkedCave(seed=seed)
+    # Noise of blocks -2..1 simulated as one grid; away from its edges it
+    # must match the chunks -1..0 stitched together, seams included
+    noise = np.block([[cave._noise(x, y) for x in range(-2, 2)] for y in range(-2, 2)])
+    for _ in range(procedural.NUMBER_OF_STEPS):
+        noise = simulation_step(noise)
+    stitched = np.block([[cave.chunk(x, y) for x in (-1, 0)] for y in (-1, 0)])
+    assert np.array_equal(noise[size:-size, size:-size], stitched)
+    assert cave.is_wall(-1, 0) == bool(stitched[size, size - 1])
+    assert cave.is_wall(0, -1) == bool(stitched[size - 1, size])
+
+
+def test_evicted_chunks_are_rebuilt_identically():
+    cave = ChunkedCave(seed=5, max_chunks=2)
+    first = cave.chunk(3, -4).copy()
+    cave.chunk(0, 0)
+    cave.chunk(3, -4)  # most recently used again
+    cave.chunk(1, 1)
+    assert list(cave.chunks) == [(3, -4), (1, 1)]
+    cave.chunk(2, 2)
+    cave.chunk(0, 0)
+    assert (3, -4) not in cave.chunks
+    assert np.array_equal(cave.chunk(3, -4), first)
+    assert np.array_equal(ChunkedCave(seed=5).chunk(3, -4), first)
+    assert len(cave.chunks) == 2
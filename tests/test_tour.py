@@ -0,0 +1,83 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from pacman_core import GameState, Level
+from pacman_graph import JunctionGraph
+from pacman_tour import (
+    JunctionDistances,
+    TourOptimizer,
+    held_karp,
+    pending_targets,
+    plan_tour,
+)
+
+
+def random_level(rng, cols, rows, walls):
+    return Level(
+        ["".join("#" if rng.random() < walls else "." for _ in range(cols)) for _ in range(rows)]
+    )
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_junction_distances_match_bfs(seed):
+    rng = random.Random(seed)
+    level = Level() if seed < 3 else random_level(rng, 30, 20, walls=0.35)
+    distances = JunctionDistances(JunctionGraph(level))
+    free = [index for index, wall in enumerate(level.walls) if not wall]
+    for _ in range(20):
+        target = rng.choice(free)
+        field = level.flow_field(target).dist
+        b = (target % level.cols, target // level.cols)
+        for index in rng.sample(free, 40):
+            a = (index % level.cols, index // level.cols)
+            assert distances.distance(a, b) == field[index]
+            path = distances.path(a, b)
+            if field[index] < 0:
+                assert path == []
+                continue
+            assert path[0] == a and path[-1] == b and len(path) - 1 == field[index]
+
+
+@pytest.mark.parametrize("budget", [0.0, 0.05, 1.0])
+def test_solve_reports_the_length_of_its_tour(budget):
+    state = GameState(Level(), seed=0, n_ghosts=0)
+    row, col = divmod(state.pacman.cell, state.level.cols)
+    graph = JunctionGraph(state.level)
+    targets = pending_targets(state)
+    optimizer = TourOptimizer(graph, (col, row), targets)
+    plan = optimizer.solve(budget)
+    assert sorted(plan.cells) == sorted(targets)
+    index = {cell: i for i, cell in enumerate(optimizer.cells)}
+    assert plan.length == optimizer.length([0] + [index[cell] for cell in plan.cells])
+    lengths = [length for _, length in plan.history]
+    assert lengths == sorted(lengths, reverse=True) and lengths[-1] == plan.length
+
+
+def test_plan_tour_visits_every_pellet():
+    state = GameState(Level(), seed=0, n_ghosts=0)
+    plan = plan_tour(state, budget=0.05)
+    assert sorted(plan.cells) == sorted(pending_targets(state))
+
+
+@pytest.mark.parametrize("n", range(1, 8))
+def test_held_karp_matches_brute_force(n):
+    rng = np.random.default_rng(n)
+    dist = rng.integers(0, 50, size=(n, n))
+    length, order = held_karp(dist)
+    best = min(
+        sum(dist[a, b] for a, b in zip((0,) + rest, rest))
+        for rest in itertools.permutations(range(1, n))
+    )
+    assert length == best
+    assert order[0] == 0 and sorted(order) == list(range(n))
+    assert sum(dist[a, b] for a, b in zip(order, order[1:])) == length
+
+
+def test_held_karp_counts_every_array_in_the_limit():
+    dist = np.ones((11, 11), dtype=int)
+    # dp sola ocupa 2**10 * 10 * 2 bytes; con las máscaras ya no cabe
+    with pytest.raises(MemoryError):
+        held_karp(dist, max_bytes=(1 << 10) * 10 * 2)